@@ -1,8 +1,9 @@
 import { useEffect, useMemo, useRef, useState } from "react";
 import { Link, useSearchParams } from "react-router-dom";
-import { fetchCatalogProducts, resolveCatalogImageUrl } from "../services/portfolioService";
+import { buildCatalogImageSrcSet, fetchCatalogProducts, resolveCatalogImageUrl } from "../services/portfolioService";
 
 const PAGE_SIZE = 24;
+const CARD_IMAGE_SIZES = "(min-width: 1280px) 25vw, (min-width: 640px) 33vw, 50vw";
 
 const sortOptions = [
   { value: "title_asc", label: "Alphabetically, A-Z" },
@@ -71,6 +72,8 @@ function Catalog() {
   const [error, setError] = useState("");
   const [mobileFiltersOpen, setMobileFiltersOpen] = useState(false);
   const gridRef = useIntersectionObserver();
+  // Card listings only carry facets on page 1; keep the last ones for later pages
+  const facetsRef = useRef(null);
 
   const filters = useMemo(
     () => ({
@@ -83,6 +86,7 @@ function Catalog() {
       selling_type: searchParams.get("selling_type") || "",
       availability: searchParams.get("availability") || "",
       sort: searchParams.get("sort") || "title_asc",
+      fields: "card",
     }),
     [searchParams]
   );
@@ -94,9 +98,12 @@ function Catalog() {
       try {
         setLoading(true);
         setError("");
-        const response = await fetchCatalogProducts(filters);
+        const response = await fetchCatalogProducts(
+          facetsRef.current ? filters : { ...filters, facets: "true" }
+        );
         if (!ignore) {
-          setData(response);
+          facetsRef.current = response.facets || facetsRef.current;
+          setData({ ...response, facets: facetsRef.current || {} });
         }
       } catch (err) {
         if (!ignore) {
@@ -341,6 +348,8 @@ function Catalog() {
                   const image2 = resolveCatalogImageUrl(product.gallery_images?.[1]?.url || "");
                   const fallback1 = product.gallery_images?.[0]?.original_url || "";
                   const fallback2 = product.gallery_images?.[1]?.original_url || "";
+                  const srcSet1 = buildCatalogImageSrcSet(product.gallery_images?.[0]);
+                  const srcSet2 = buildCatalogImageSrcSet(product.gallery_images?.[1]);
                   const hasSecond = !!image2;
                   return (
                     <Link
@@ -354,12 +363,15 @@ function Catalog() {
                           <>
                             <img
                               src={image1}
+                              srcSet={srcSet1 || undefined}
+                              sizes={srcSet1 ? CARD_IMAGE_SIZES : undefined}
                               alt={product.title}
                               className={`w-full h-full object-cover transition-opacity duration-500 ${hasSecond ? "group-hover:opacity-0" : "group-hover:scale-105 transition-transform duration-500"}`}
                               loading="lazy"
                               onError={(e) => {
                                 if (!e.target.dataset.triedFallback && fallback1) {
                                   e.target.dataset.triedFallback = "1";
+                                  e.target.removeAttribute("srcset");
                                   e.target.src = fallback1;
                                 } else {
                                   e.target.style.display = "none";
@@ -369,12 +381,15 @@ function Catalog() {
                             {hasSecond && (
                               <img
                                 src={image2}
+                                srcSet={srcSet2 || undefined}
+                                sizes={srcSet2 ? CARD_IMAGE_SIZES : undefined}
                                 alt={`${product.title} - hover`}
                                 className="absolute inset-0 w-full h-full object-cover opacity-0 group-hover:opacity-100 transition-opacity duration-500"
                                 loading="lazy"
                                 onError={(e) => {
                                   if (!e.target.dataset.triedFallback && fallback2) {
                                     e.target.dataset.triedFallback = "1";
+                                    e.target.removeAttribute("srcset");
                                     e.target.src = fallback2;
                                   } else {
                                     e.target.style.display = "none";
@@ -6,12 +6,12 @@ import ConfirmModal from "./ConfirmModal";
 import { useToast } from "./Toast";
 import {
   fetchProjectsManifest,
-  fetchProjectMetadata,
+  fetchProjectMetadataBatch,
   createProject,
   updateProject,
   deleteProject,
   getUploadUrls,
-  uploadFile,
+  uploadToS3,
 } from "../services/portfolioService";
 
 function Dashboard() {
@@ -73,25 +73,16 @@ function Dashboard() {
       setError(null);
       const manifest = await fetchProjectsManifest();
 
-      // Fetch full metadata for each project in batches
-      const BATCH_SIZE = 3;
-      const allProjects = [];
-
-      for (let i = 0; i < manifest.projects.length; i += BATCH_SIZE) {
-        const batch = manifest.projects.slice(i, i + BATCH_SIZE);
-        const batchResults = await Promise.all(
-          batch.map(async (p) => {
-            try {
-              const metadata = await fetchProjectMetadata(p.category, p.id);
-              return { ...metadata, category: p.category };
-            } catch (err) {
-              console.error(`Failed to load project ${p.id}:`, err);
-              return { ...p, title: p.title || p.id };
-            }
-          })
-        );
-        allProjects.push(...batchResults);
-      }
+      // Fetch full metadata for every project in one batch request
+      const metadataList = await fetchProjectMetadataBatch(manifest.projects);
+      const allProjects = manifest.projects.map((p, index) => {
+        const metadata = metadataList[index];
+        if (!metadata) {
+          console.error(`Failed to load project ${p.id}`);
+          return { ...p, title: p.title || p.id };
+        }
+        return { ...metadata, category: p.category };
+      });
 
       setProjects(allProjects);
     } catch (err) {
@@ -194,7 +185,7 @@ function Dashboard() {
         const uploadResponse = await getUploadUrls(
           currentProject.category,
           projectId,
-          filesToUpload.map(f => ({ filename: f.filename, type: f.type, contentType: f.contentType })),
+          filesToUpload.map(f => ({ filename: f.filename, type: f.type, contentType: f.contentType, size: f.file.size })),
           getAdminPassword()
         );
         uploadUrls = uploadResponse.uploadUrls || uploadResponse || [];
@@ -204,17 +195,17 @@ function Dashboard() {
       for (let i = 0; i < filesToUpload.length; i++) {
         const file = filesToUpload[i];
         setUploadProgress(`Uploading ${file.filename}...`);
-        const url = uploadUrls[i]?.uploadUrl;
-        if (url) {
+        const upload = uploadUrls[i];
+        if (upload?.uploadUrl || upload?.multipart) {
           // Calculate base progress for this file
           const baseProgress = Math.round((i / totalFiles) * 80);
           const fileProgressWeight = 80 / totalFiles;
 
-          await uploadFile(url, file.file, (filePercent) => {
+          await uploadToS3(upload, file.file, (filePercent) => {
             // Update progress based on current file's upload progress
             const totalProgress = baseProgress + Math.round((filePercent / 100) * fileProgressWeight);
             setUploadPercentage(totalProgress);
-          });
+          }, getAdminPassword());
         }
         setUploadPercentage(Math.round(((i + 1) / totalFiles) * 80));
       }
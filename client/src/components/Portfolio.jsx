@@ -24,14 +24,32 @@ const ProjectCard = ({ category, project }) => (
   <div className="relative group overflow-hidden sm:rounded-lg sm:shadow-lg">
     <Link to={`/portfolio/${category}/${project.id}`} className="block">
       <div className="relative overflow-hidden sm:rounded-lg sm:shadow-lg">
-        <VideoPlayer
-          videoUrl={project.video}
-          className="w-full h-64 object-cover"
-          enableHoverPlay={true}
-          autoPlay={false}
-          defaultMuted={true}
-          showMuteButton={false}
-        />
+        {project.preview ? (
+          // Poster image plus a small MP4 loop on hover; no HLS stream per card
+          <video
+            src={project.preview}
+            poster={project.poster || undefined}
+            className="w-full h-64 object-cover"
+            preload="none"
+            loop
+            muted
+            playsInline
+            onMouseEnter={(e) => e.target.play()}
+            onMouseLeave={(e) => {
+              e.target.pause();
+              e.target.currentTime = 0;
+            }}
+          />
+        ) : (
+          <VideoPlayer
+            videoUrl={project.video}
+            className="w-full h-64 object-cover"
+            enableHoverPlay={true}
+            autoPlay={false}
+            defaultMuted={true}
+            showMuteButton={false}
+          />
+        )}
       </div>
     </Link>
     <div className="mt-4 text-left px-2 sm:px-0">
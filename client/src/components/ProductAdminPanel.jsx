@@ -8,7 +8,7 @@ import {
   fetchCatalogProducts,
   getProductUploadUrls,
   updateCatalogProduct,
-  uploadFile,
+  uploadToS3,
 } from "../services/portfolioService";
 
 function ProductAdminPanel() {
@@ -135,15 +135,15 @@ function ProductAdminPanel() {
     try {
       const response = await getProductUploadUrls(
         productIdentifier,
-        files.map(({ filename, type, contentType }) => ({ filename, type, contentType })),
+        files.map(({ filename, type, contentType, file }) => ({ filename, type, contentType, size: file.size })),
         adminPassword
       );
 
       const uploadUrls = response.uploadUrls || [];
       for (let index = 0; index < files.length; index += 1) {
         const currentFile = files[index];
-        const uploadUrl = uploadUrls[index]?.uploadUrl;
-        if (!uploadUrl) {
+        const upload = uploadUrls[index];
+        if (!upload?.uploadUrl && !upload?.multipart) {
           throw new Error(`Missing upload URL for ${currentFile.filename}`);
         }
 
@@ -151,9 +151,9 @@ function ProductAdminPanel() {
         const baseProgress = Math.round((index / files.length) * 100);
         const segmentWeight = 100 / files.length;
 
-        await uploadFile(uploadUrl, currentFile.file, (percent) => {
+        await uploadToS3(upload, currentFile.file, (percent) => {
           setUploadProgress(baseProgress + Math.round((percent / 100) * segmentWeight));
-        });
+        }, adminPassword);
       }
 
       setUploadStatus("Upload complete. Processing media in background...");
@@ -71,12 +71,20 @@ function transformMetadataUrls(metadata) {
     if (transformed.cover) {
         transformed.cover = prefixS3Url(transformed.cover);
     }
+    if (transformed.coverPoster) {
+        transformed.coverPoster = prefixS3Url(transformed.coverPoster);
+    }
+    if (transformed.coverPreview) {
+        transformed.coverPreview = prefixS3Url(transformed.coverPreview);
+    }
 
     // Transform media array
     if (transformed.media && Array.isArray(transformed.media)) {
         transformed.media = transformed.media.map(item => ({
             ...item,
-            src: prefixS3Url(item.src)
+            src: prefixS3Url(item.src),
+            ...(item.poster ? { poster: prefixS3Url(item.poster) } : {}),
+            ...(item.preview ? { preview: prefixS3Url(item.preview) } : {})
         }));
     }
 
@@ -138,6 +146,55 @@ export async function fetchProjectMetadata(category, projectId, retries = 3) {
     }
 }
 
+/**
+ * Fetch metadata for several projects at once via POST /projects/batch,
+ * falling back to one request per project if the API is unavailable
+ * @param {Array<{category: string, id: string}>} refs - Projects to load
+ * @returns {Promise<Array<Object|null>>} Metadata per ref, null if not found or failed
+ */
+export async function fetchProjectMetadataBatch(refs) {
+    const MAX_PER_REQUEST = 100; // BATCH_MAX_PROJECTS in the API
+    const keyOf = (category, id) => `${category}/${id}`;
+
+    if (API_BASE_URL) {
+        try {
+            const found = new Map();
+            for (let i = 0; i < refs.length; i += MAX_PER_REQUEST) {
+                const response = await fetch(`${API_BASE_URL}/projects/batch`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({
+                        projects: refs.slice(i, i + MAX_PER_REQUEST).map(({ category, id }) => ({ category, id }))
+                    })
+                });
+                if (!response.ok) throw new Error(`Batch request failed with ${response.status}`);
+                const data = await response.json();
+                for (const item of data.projects) {
+                    found.set(keyOf(item.category, item.id), item.found ? transformMetadataUrls(item.project) : null);
+                }
+            }
+            return refs.map(ref => found.get(keyOf(ref.category, ref.id)) ?? null);
+        } catch (err) {
+            console.warn('Batch project metadata unavailable, loading projects one by one:', err.message);
+        }
+    }
+
+    const BATCH_SIZE = 3;
+    const results = [];
+    for (let i = 0; i < refs.length; i += BATCH_SIZE) {
+        const batch = refs.slice(i, i + BATCH_SIZE);
+        results.push(...await Promise.all(batch.map(async (ref) => {
+            try {
+                return await fetchProjectMetadata(ref.category, ref.id);
+            } catch (error) {
+                console.error(`Failed to load project ${ref.id}:`, error);
+                return null;
+            }
+        })));
+    }
+    return results;
+}
+
 /**
  * Transform manifest data to match the old portfolioData.js format
  * for backward compatibility with existing components
@@ -170,24 +227,26 @@ export async function fetchPortfolioData() {
         };
     }
 
-    // Fetch metadata in batches to avoid Lambda throttling
+    // projects.json entries carry their listing fields; only entries written before
+    // that (e.g. an old manifest read from the S3 fallback) need their metadata.json
     const BATCH_SIZE = 3;
-    const projects = [];
+    const projects = manifest.projects.map(projectRef =>
+        'mediaCount' in projectRef ? transformMetadataUrls(projectRef) : null
+    );
+    const missing = manifest.projects
+        .map((projectRef, index) => ({ projectRef, index }))
+        .filter(({ index }) => projects[index] === null);
 
-    for (let i = 0; i < manifest.projects.length; i += BATCH_SIZE) {
-        const batch = manifest.projects.slice(i, i + BATCH_SIZE);
-        const batchPromises = batch.map(async (projectRef) => {
+    for (let i = 0; i < missing.length; i += BATCH_SIZE) {
+        const batch = missing.slice(i, i + BATCH_SIZE);
+        await Promise.all(batch.map(async ({ projectRef, index }) => {
             try {
                 const metadata = await fetchProjectMetadata(projectRef.category, projectRef.id);
-                return { ...metadata, category: projectRef.category };
+                projects[index] = { ...metadata, category: projectRef.category };
             } catch (error) {
                 console.error(`Failed to load project ${projectRef.id}:`, error);
-                return null;
             }
-        });
-
-        const batchResults = await Promise.all(batchPromises);
-        projects.push(...batchResults);
+        }));
     }
 
     // Add projects to their categories
@@ -203,14 +262,13 @@ export async function fetchPortfolioData() {
             }
             portfolioData[project.category].projects.push({
                 id: project.id,
-                title: project.title,
+                title: project.title || project.id,
                 area: project.area || '',
                 description: project.description || '',
-                video: prefixS3Url(project.cover),
-                details: (project.media || []).map(item => ({
-                    type: item.type,
-                    src: prefixS3Url(item.src)
-                }))
+                video: project.cover,
+                poster: project.coverPoster || '',
+                preview: project.coverPreview || '',
+                mediaCount: project.mediaCount ?? (project.media || []).length
             });
         }
     }
@@ -390,6 +448,97 @@ export async function uploadFile(uploadUrl, file, onProgress) {
     });
 }
 
+/**
+ * Call one of the multipart upload session endpoints (create, parts, complete, abort)
+ * @param {string} action - Endpoint name
+ * @param {Object} body - {s3Key, uploadId, ...}
+ * @param {string} adminPassword - Admin password
+ * @returns {Promise<Object>} Response body
+ */
+async function postMultipartUpload(action, body, adminPassword) {
+    const response = await fetch(`${API_BASE_URL}/uploads/multipart/${action}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-Admin-Password': adminPassword
+        },
+        body: JSON.stringify(body)
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.error || `Multipart upload ${action} failed`);
+    }
+
+    return response.json();
+}
+
+/**
+ * Upload a file described by an upload-urls entry: a single presigned PUT, or
+ * for large files a multipart session whose parts upload in parallel and are
+ * retried one by one, so a dropped connection only repeats that part
+ * @param {Object} upload - Entry from getUploadUrls/getProductUploadUrls
+ * @param {File} file - File to upload
+ * @param {Function} onProgress - Progress callback (0-100)
+ * @param {string} adminPassword - Admin password (completes/aborts multipart uploads)
+ * @returns {Promise<void>}
+ */
+export async function uploadToS3(upload, file, onProgress, adminPassword) {
+    if (!upload.multipart) {
+        return uploadFile(upload.uploadUrl, file, onProgress);
+    }
+
+    const PART_CONCURRENCY = 4;
+    const PART_RETRIES = 3;
+    const { s3Key, partSize, partCount } = upload;
+    // The session only exists once the upload actually starts
+    const session = await postMultipartUpload('create', { s3Key, partCount, contentType: upload.contentType }, adminPassword);
+    const { uploadId } = session;
+    const partUrls = new Map(session.parts.map(part => [part.partNumber, part.uploadUrl]));
+    const loaded = new Array(partCount).fill(0);
+    const reportProgress = () => {
+        if (onProgress) onProgress(Math.round((loaded.reduce((sum, n) => sum + n, 0) / file.size) * 100));
+    };
+
+    const uploadPart = async (partNumber) => {
+        const start = (partNumber - 1) * partSize;
+        const blob = file.slice(start, Math.min(start + partSize, file.size));
+        for (let attempt = 0; ; attempt++) {
+            try {
+                await uploadFile(partUrls.get(partNumber), blob, (percent) => {
+                    loaded[partNumber - 1] = (blob.size * percent) / 100;
+                    reportProgress();
+                });
+                return;
+            } catch (error) {
+                if (attempt >= PART_RETRIES) throw error;
+                await delay(Math.pow(2, attempt) * 1000);
+                // Re-sign in case the URL expired; S3 may also already have the part
+                const refreshed = await postMultipartUpload('parts', { s3Key, uploadId, partNumbers: [partNumber] }, adminPassword);
+                if (refreshed.uploadedParts.some(part => part.partNumber === partNumber)) return;
+                partUrls.set(partNumber, refreshed.parts[0].uploadUrl);
+            }
+        }
+    };
+
+    let nextPart = 0;
+    const worker = async () => {
+        while (nextPart < partCount) {
+            nextPart += 1;
+            const partNumber = nextPart;
+            await uploadPart(partNumber);
+        }
+    };
+
+    try {
+        await Promise.all(Array.from({ length: Math.min(PART_CONCURRENCY, partCount) }, worker));
+        await postMultipartUpload('complete', { s3Key, uploadId, partCount }, adminPassword);
+    } catch (error) {
+        postMultipartUpload('abort', { s3Key, uploadId }, adminPassword).catch(() => {});
+        throw error;
+    }
+}
+
 /**
  * Resolve a catalog image URL. Currently images are external (Shopify CDN).
  * When images are migrated to S3, relative paths will be prefixed with S3_BASE_URL.
@@ -408,6 +557,19 @@ export function resolveCatalogImageUrl(url) {
     return `${base}/${rel}`;
 }
 
+/**
+ * Build a srcset from the WebP variants recorded by the media processor.
+ * @param {Object} image - Gallery image ({ url, variants: [{ url, width }] })
+ * @returns {string} srcset value, or '' when the image has no variants
+ */
+export function buildCatalogImageSrcSet(image) {
+    const variants = Array.isArray(image?.variants) ? image.variants : [];
+    return variants
+        .filter((variant) => variant?.url && variant?.width)
+        .map((variant) => `${resolveCatalogImageUrl(variant.url)} ${variant.width}w`)
+        .join(', ');
+}
+
 /**
  * Apply client-side filtering, sorting, and pagination to a products array.
  * Mirrors the Lambda API's list_catalog_products() behaviour.
@@ -690,12 +852,14 @@ export async function getProductUploadUrls(productIdOrHandle, files, adminPasswo
 export default {
     fetchProjectsManifest,
     fetchProjectMetadata,
+    fetchProjectMetadataBatch,
     fetchPortfolioData,
     createProject,
     updateProject,
     deleteProject,
     getUploadUrls,
     uploadFile,
+    uploadToS3,
     fetchCatalogProducts,
     fetchCatalogProductDetail,
     createCatalogProduct,
@@ -703,4 +867,5 @@ export default {
     deleteCatalogProduct,
     getProductUploadUrls,
     resolveCatalogImageUrl,
+    buildCatalogImageSrcSet,
 };
@@ -2,75 +2,422 @@
 AWS Lambda Function: Projects API
 
 Provides REST API endpoints for project management:
-- GET /projects - List all projects
+- GET /projects - List all projects, each with its listing fields (title, cover, poster, media count)
 - GET /projects/{category}/{id} - Get project details
+- POST /projects/batch - Get several projects' details in one request
+- POST /projects/summaries - Fill in listing fields for projects.json entries created before
+  they existed; run once after deploying (admin)
 - POST /projects - Create new project (admin)
 - PUT /projects/{category}/{id} - Update project metadata (admin)
-- DELETE /projects/{category}/{id} - Delete project (admin)
+- DELETE /projects/{category}/{id} - Delete project (admin); ?async=true|false overrides
+  the automatic choice between deleting inline (200) and a background job (202)
+- GET /jobs/{id} - Status of a background job (admin)
+- POST /uploads/multipart/create - Start a multipart upload and sign its part URLs (admin)
+- POST /uploads/multipart/parts - Fresh part URLs and the parts already stored, to resume (admin)
+- POST /uploads/multipart/complete - Assemble a multipart upload (admin)
+- POST /uploads/multipart/abort - Discard a multipart upload (admin)
+
+Upload URL requests (files: [{filename, type, contentType, size}]) get one presigned PUT
+per file, or, for files of at least MULTIPART_THRESHOLD_BYTES, a multipart plan (part
+size and count) whose session is started through /uploads/multipart/create when the
+upload begins; its parts can be uploaded in parallel. The upload processor runs once the
+upload is completed (its S3 notification must include
+s3:ObjectCreated:CompleteMultipartUpload). Uploads abandoned mid-way (closed tab) keep
+their parts, which S3 bills for until aborted: give the bucket a lifecycle rule with
+AbortIncompleteMultipartUpload (e.g. DaysAfterInitiation: 1) on the uploads/ prefix.
+
+JSON writes are conditional (PutObject IfMatch / IfNoneMatch), which needs boto3 and
+botocore 1.35.69 or newer; package a newer boto3 with the function if the runtime's is older.
 
 Environment Variables:
 - BUCKET_NAME: S3 bucket name
 - ADMIN_PASSWORD: Admin password for protected operations
+- CACHE_TTL_SECONDS: Seconds a cached S3 JSON object is served before ETag revalidation (default: 30)
+- CACHE_MAX_BYTES: Upper bound on raw JSON bytes kept in the warm-container cache (default: 64 MB)
+- WRITE_MAX_ATTEMPTS: Attempts for an optimistic (If-Match) JSON write before giving up (default: 5)
+- BATCH_READ_CONCURRENCY: Parallel metadata.json reads for POST /projects/batch, also the
+  S3 connection pool size (default: 16)
+- DELETE_CONCURRENCY: DeleteObjects calls (1,000 keys each) in flight at once (default: 8)
+- DELETE_ASYNC_THRESHOLD: Project deletes with more objects than this return 202 and finish
+  in an asynchronous invocation of this function (needs lambda:InvokeFunction on itself;
+  only used when running in Lambda; without the grant the delete runs inline) (default: 2000)
+- MULTIPART_THRESHOLD_BYTES: Files this large are uploaded as multipart sessions (default: 64 MB)
+- MULTIPART_PART_SIZE: Bytes per uploaded part, raised when a file would need more than
+  10,000 parts (default: 16 MB)
+- PREWARM_ON_INIT: "true" loads projects.json and the catalog (plus its listing/search
+  indexes) while the function initializes, for provisioned concurrency (default: false).
+  With SnapStart the same warm-up runs before the snapshot is taken. A
+  {"action": "warmup"} event (e.g. a schedule) does it on demand.
+- COMPRESS_RESPONSES: "true" gzip/brotli-compresses cacheable GET responses per the client's
+  Accept-Encoding; they are returned base64-encoded (isBase64Encoded), so an API Gateway
+  REST API must list "*/*" in binaryMediaTypes or browsers receive base64 text (HTTP APIs
+  and function URLs need no setting) (default: false)
+- COMPRESS_MIN_BYTES: With COMPRESS_RESPONSES, bodies at least this large are compressed
+  (default: 1024)
+- CATALOG_STORAGE: "single" keeps the whole catalog in catalog/products.json (default);
+  "sharded" stores one object per product under catalog/items/ plus a slim catalog/index.json
 """
 
+import time
+
+# Taken before the other imports so the cold-start log covers all of module init
+INIT_STARTED = time.perf_counter()
+
+import base64
+import bisect
+import gzip
+import hashlib
+import heapq
 import json
 import os
-import boto3
-from botocore.config import Config
+import random
+import re
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from botocore.exceptions import ClientError
 
-# Initialize S3 client with explicit region and configuration
-# Force regional endpoint to avoid IllegalLocationConstraintException
-s3_config = Config(
-    region_name='me-central-1',
-    signature_version='s3v4',
-    s3={'addressing_style': 'virtual'}
-)
-s3 = boto3.client('s3', config=s3_config)
+try:
+    # Optional: only used when bundled with the function; gzip is always available
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # Lambda SnapStart runtime hooks; absent outside SnapStart-enabled runtimes
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError:
+    register_after_restore = register_before_snapshot = None
+
+BATCH_READ_CONCURRENCY = max(1, int(os.environ.get('BATCH_READ_CONCURRENCY', '16')))
+# Most projects one POST /projects/batch request may ask for
+BATCH_MAX_PROJECTS = 100
+DELETE_CONCURRENCY = max(1, int(os.environ.get('DELETE_CONCURRENCY', '8')))
+DELETE_ASYNC_THRESHOLD = int(os.environ.get('DELETE_ASYNC_THRESHOLD', '2000'))
+# DeleteObjects accepts at most this many keys per call
+S3_DELETE_BATCH_SIZE = 1000
+JOBS_PREFIX = 'jobs/'
+# Per-key errors kept in responses and job status objects
+MAX_REPORTED_ERRORS = 100
+MULTIPART_THRESHOLD_BYTES = int(os.environ.get('MULTIPART_THRESHOLD_BYTES', str(64 * 1024 * 1024)))
+# S3 limits: parts are at least 5 MB (except the last), at most 10,000 per upload
+MULTIPART_PART_SIZE = max(5 * 1024 * 1024, int(os.environ.get('MULTIPART_PART_SIZE', str(16 * 1024 * 1024))))
+MULTIPART_MAX_PARTS = 10000
+UPLOAD_URL_EXPIRES = 3600
+
+# boto3 (and botocore.config) take most of the import time; clients are built on first use
+# (threads of a batch read may race for the first one, hence the lock)
+s3 = None
+lambda_client = None
+_client_lock = threading.Lock()
+
+def get_s3():
+    global s3
+    if s3 is None:
+        with _client_lock:
+            if s3 is None:
+                import boto3
+                from botocore.config import Config
+                # Initialize S3 client with explicit region and configuration
+                # Force regional endpoint to avoid IllegalLocationConstraintException
+                s3 = boto3.client('s3', config=Config(
+                    region_name='me-central-1',
+                    signature_version='s3v4',
+                    s3={'addressing_style': 'virtual'},
+                    max_pool_connections=max(BATCH_READ_CONCURRENCY, DELETE_CONCURRENCY)
+                ))
+    return s3
+
+def get_lambda_client():
+    global lambda_client
+    if lambda_client is None:
+        with _client_lock:
+            if lambda_client is None:
+                import boto3
+                from botocore.config import Config
+                lambda_client = boto3.client('lambda', config=Config(region_name='me-central-1'))
+    return lambda_client
 
 BUCKET_NAME = os.environ.get('BUCKET_NAME', '')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 CATALOG_KEY = 'catalog/products.json'
+CATALOG_STORAGE = os.environ.get('CATALOG_STORAGE', 'single').strip().lower()
+CATALOG_INDEX_KEY = 'catalog/index.json'
+CATALOG_ITEMS_PREFIX = 'catalog/items/'
+# Product fields kept in the sharded listing index: everything list_catalog_products()
+# filters or sorts on, plus what catalog cards and related-product tiles render.
+LISTING_FIELDS = (
+    'product_id', 'handle', 'title', 'product_number', 'price', 'compare_at_price',
+    'price_currency', 'available', 'primary_image', 'usage_image_url', 'usage_image_original',
+    'collections', 'material', 'selling_type', 'created_at', 'updated_at',
+)
+LISTING_GALLERY_IMAGES = 2
+# Named projections for GET /catalog?fields=...; precomputed once per catalog version.
+# "card" is what a catalog grid tile renders: its first two gallery images, each reduced to
+# the URL and WebP variants (primary_image is the first image's URL again, so it is left out).
+CATALOG_PROJECTIONS = {
+    'card': (
+        'product_id', 'handle', 'title', 'price', 'compare_at_price', 'price_currency',
+        'available', 'gallery_images',
+    ),
+}
+CARD_GALLERY_IMAGE_FIELDS = ('url', 'variants')
+GALLERY_IMAGE_EXTRA_FIELDS = ('original_url', 'width', 'height', 'variants', 'poster', 'preview')
+SEARCH_INDEX_KEY = 'catalog/search-index.json'
+RELATED_PRODUCTS_KEY = 'catalog/related-products.json'
+RELATED_PRODUCTS_LIMIT = 8
+MANIFEST_KEY = 'projects.json'
+# Listing fields copied from each project's metadata.json into its projects.json entry
+# (plus mediaCount), so the portfolio grid renders from GET /projects alone
+PROJECT_SUMMARY_FIELDS = ('title', 'area', 'description', 'cover', 'coverPoster', 'coverPreview')
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '30'))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+WRITE_MAX_ATTEMPTS = int(os.environ.get('WRITE_MAX_ATTEMPTS', '5'))
+WRITE_RETRY_BASE_SECONDS = 0.05
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'false').strip().lower() == 'true'
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+# GET responses carry an ETag; browsers always revalidate (a 304 is nearly free),
+# shared caches may hold public catalog responses briefly.
+RESPONSE_CACHE_CONTROL = {
+    'projects': 'no-cache',
+    'project': 'no-cache',
+    'catalog': 'public, max-age=0, s-maxage=30, stale-while-revalidate=60',
+}
+
+# Parsed JSON objects kept between warm invocations, keyed by S3 key.
+# Each entry: {'data', 'etag', 'size', 'checkedAt'}; insertion order doubles as LRU order.
+_json_cache = {}
+
+def _evict_cached_json():
+    total = sum(entry['size'] for entry in _json_cache.values())
+    while total > CACHE_MAX_BYTES and _json_cache:
+        oldest_key = next(iter(_json_cache))
+        total -= _json_cache.pop(oldest_key)['size']
+
+def store_cached_json(key, data, etag, size):
+    """Remember a parsed S3 object together with the ETag it was read or written with."""
+    _json_cache.pop(key, None)
+    if not etag or size > CACHE_MAX_BYTES:
+        return
+    _json_cache[key] = {'data': data, 'etag': etag, 'size': size, 'checkedAt': time.monotonic()}
+    _evict_cached_json()
+
+def invalidate_cached_json(key):
+    _json_cache.pop(key, None)
+
+def expire_cached_json():
+    """Make every cached object revalidate (by ETag) on its next read."""
+    for entry in _json_cache.values():
+        entry['checkedAt'] = float('-inf')
+
+def get_cached_json_entry(key, revalidate=False):
+    """
+    Fetch and parse a JSON object from S3, reusing the warm-container copy.
+    Returns (data, etag).
+
+    Within CACHE_TTL_SECONDS the cached object is returned without any S3 call
+    (unless revalidate=True). After that a conditional GetObject (If-None-Match
+    on the cached ETag) is issued; a 304 keeps the parsed copy, anything else
+    replaces it. Raises ClientError exactly like get_object (e.g. NoSuchKey).
+    The returned object is shared: callers must not mutate it.
+    """
+    now = time.monotonic()
+    entry = _json_cache.get(key)
+    if entry and not revalidate and now - entry['checkedAt'] < CACHE_TTL_SECONDS:
+        _json_cache[key] = _json_cache.pop(key)
+        return entry['data'], entry['etag']
+
+    params = {'Bucket': BUCKET_NAME, 'Key': key}
+    if entry:
+        params['IfNoneMatch'] = entry['etag']
+    try:
+        response = get_s3().get_object(**params)
+    except ClientError as e:
+        code = str(e.response.get('Error', {}).get('Code'))
+        if entry and code in ('304', 'NotModified'):
+            entry['checkedAt'] = now
+            _json_cache[key] = _json_cache.pop(key)
+            return entry['data'], entry['etag']
+        invalidate_cached_json(key)
+        raise
+
+    raw = response['Body'].read()
+    data = json.loads(raw.decode('utf-8'))
+    store_cached_json(key, data, response.get('ETag'), len(raw))
+    return data, response.get('ETag')
+
+def cached_etag(key):
+    """ETag of the warm-container copy of key, or None if it is not cached."""
+    entry = _json_cache.get(key)
+    return entry['etag'] if entry else None
+
+def get_cached_json(key):
+    """Parsed JSON object from S3 via the warm-container cache (see get_cached_json_entry)."""
+    return get_cached_json_entry(key)[0]
+
+def put_json_object(key, data, indent=2, if_match=None, create_only=False):
+    """
+    Write a JSON object to S3 and refresh the warm-container cache with it.
+    if_match makes the write conditional on the object's current ETag;
+    create_only makes it fail if the object already exists.
+    """
+    body = json.dumps(data, indent=indent)
+    params = {
+        'Bucket': BUCKET_NAME,
+        'Key': key,
+        'Body': body,
+        'ContentType': 'application/json'
+    }
+    if if_match:
+        params['IfMatch'] = if_match
+    elif create_only:
+        params['IfNoneMatch'] = '*'
+    response = get_s3().put_object(**params)
+    store_cached_json(key, data, response.get('ETag'), len(body.encode('utf-8')))
+    return response
+
+def is_write_conflict(error):
+    """True for the errors S3 returns when a conditional write lost a race."""
+    return str(error.response.get('Error', {}).get('Code')) in (
+        'PreconditionFailed', 'ConditionalRequestConflict', '412', '409'
+    )
+
+def update_json_object(key, mutate, default=None, indent=2):
+    """
+    Optimistic read-modify-write of a JSON object using If-Match on its ETag.
+
+    mutate(current) receives the current object (default() when it does not
+    exist, or None without a default) and returns the object to write, or None
+    to leave S3 untouched. It must not modify current in place: when another
+    writer got there first, the object is re-read and mutate() is applied
+    again to the fresh version, up to WRITE_MAX_ATTEMPTS times.
+    Returns the written object, or None if mutate() declined.
+    """
+    for attempt in range(WRITE_MAX_ATTEMPTS):
+        try:
+            current, etag = get_cached_json_entry(key, revalidate=True)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'NoSuchKey':
+                raise
+            current, etag = (default() if default else None), None
+
+        updated = mutate(current)
+        if updated is None:
+            return None
+        try:
+            put_json_object(key, updated, indent=indent, if_match=etag, create_only=etag is None)
+            return updated
+        except ClientError as e:
+            if not is_write_conflict(e) or attempt == WRITE_MAX_ATTEMPTS - 1:
+                raise
+            invalidate_cached_json(key)
+            print(f"Write conflict on {key}, retrying (attempt {attempt + 1})")
+            time.sleep(WRITE_RETRY_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+def get_optional_json(key):
+    """Like get_cached_json(), but returns None when the object does not exist yet."""
+    try:
+        return get_cached_json(key)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            return None
+        raise
+
+def default_project_categories():
+    return {
+        "architectural": {"title": "Architectural", "description": "Architectural design projects"},
+        "interior": {"title": "Interior", "description": "Interior design projects"},
+        "fit": {"title": "Fit Out", "description": "Fit out projects"}
+    }
+
+def default_projects_manifest():
+    return {
+        "version": "1.0",
+        "lastUpdated": datetime.utcnow().isoformat() + "Z",
+        "categories": default_project_categories(),
+        "projects": []
+    }
 
 def get_projects_manifest():
-    """Fetch projects.json from S3"""
+    """Fetch projects.json from S3 (cached between warm invocations; do not mutate)"""
     try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key='projects.json')
-        manifest = json.loads(response['Body'].read().decode('utf-8'))
+        manifest = get_cached_json(MANIFEST_KEY)
         
-        # Ensure categories exist with defaults if empty
+        # Ensure categories exist with defaults if empty (on a copy: the cached object is shared)
         if not manifest.get('categories'):
-            manifest['categories'] = {
-                "architectural": {"title": "Architectural", "description": "Architectural design projects"},
-                "interior": {"title": "Interior", "description": "Interior design projects"},
-                "fit": {"title": "Fit Out", "description": "Fit out projects"}
-            }
+            manifest = dict(manifest, categories=default_project_categories())
         return manifest
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             # Return empty manifest if not exists
-            return {
-                "version": "1.0",
-                "lastUpdated": datetime.utcnow().isoformat() + "Z",
-                "categories": {
-                    "architectural": {"title": "Architectural", "description": "Architectural design projects"},
-                    "interior": {"title": "Interior", "description": "Interior design projects"},
-                    "fit": {"title": "Fit Out", "description": "Fit out projects"}
-                },
-                "projects": []
-            }
+            return default_projects_manifest()
         raise
 
-def save_projects_manifest(manifest):
-    """Save projects.json to S3"""
-    manifest['lastUpdated'] = datetime.utcnow().isoformat() + "Z"
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key='projects.json',
-        Body=json.dumps(manifest, indent=2),
-        ContentType='application/json'
-    )
+def update_projects_manifest(mutate):
+    """
+    Apply mutate(manifest) -> new manifest | None to projects.json with
+    optimistic concurrency (see update_json_object). Returns the written
+    manifest, or None if mutate() declined.
+    """
+    def apply(manifest):
+        if not manifest.get('categories'):
+            manifest = dict(manifest, categories=default_project_categories())
+        updated = mutate(manifest)
+        if updated is not None:
+            updated['lastUpdated'] = datetime.utcnow().isoformat() + "Z"
+        return updated
+
+    return update_json_object(MANIFEST_KEY, apply, default=default_projects_manifest)
+
+def project_summary(metadata):
+    """The projects.json listing fields for a project's metadata."""
+    summary = {key: metadata.get(key) or '' for key in PROJECT_SUMMARY_FIELDS}
+    summary['mediaCount'] = len(metadata.get('media') or [])
+    return summary
+
+def sync_project_summary(category, project_id, metadata):
+    """Refresh the listing fields of one projects.json entry after its metadata changed."""
+    summary = project_summary(metadata)
+
+    def apply(manifest):
+        changed = False
+        projects = []
+        for p in manifest['projects']:
+            if p['id'] == project_id and p['category'] == category and any(
+                    p.get(key) != value for key, value in summary.items()):
+                p = dict(p, **summary)
+                changed = True
+            projects.append(p)
+        return dict(manifest, projects=projects) if changed else None
+
+    update_projects_manifest(apply)
+
+def backfill_project_summaries():
+    """
+    One-off migration (POST /projects/summaries): give projects.json entries
+    written before listing fields existed their summary from metadata.json.
+    Entries without metadata get an empty summary. Returns how many entries
+    were filled; errors propagate so the caller can retry.
+    """
+    missing = [p for p in get_projects_manifest()['projects'] if 'mediaCount' not in p]
+    if not missing:
+        return 0
+
+    results = get_project_metadata_batch([(p['category'], p['id']) for p in missing])
+    summaries = {(r['category'], r['id']): project_summary(r['project'] or {}) for r in results}
+
+    def apply(current):
+        projects = [
+            dict(p, **summaries[(p['category'], p['id'])])
+            if 'mediaCount' not in p and (p['category'], p['id']) in summaries else p
+            for p in current['projects']
+        ]
+        return dict(current, projects=projects)
+
+    update_projects_manifest(apply)
+    return len(summaries)
 
 def default_catalog_data():
     return {
@@ -85,31 +432,247 @@ def default_catalog_data():
         }
     }
 
+def is_sharded_catalog():
+    return CATALOG_STORAGE == 'sharded'
+
+def catalog_item_key(product):
+    return f"{CATALOG_ITEMS_PREFIX}{product.get('product_id')}.json"
+
+def build_listing_record(product):
+    """Slim copy of a product for the sharded listing index."""
+    record = {key: product[key] for key in LISTING_FIELDS if key in product}
+    gallery_images = product.get('gallery_images')
+    record['gallery_images'] = gallery_images[:LISTING_GALLERY_IMAGES] if isinstance(gallery_images, list) else []
+    return record
+
+def build_catalog_listing(catalog):
+    return {
+        'version': catalog.get('version', '1.0'),
+        'lastUpdated': catalog.get('lastUpdated'),
+        'products': [build_listing_record(p) for p in catalog.get('products', [])],
+        'facets': catalog.get('facets') or build_catalog_facets(catalog.get('products', [])),
+    }
+
 def get_catalog_data():
-    """Fetch catalog JSON from S3."""
+    """
+    Fetch catalog JSON from S3 (cached between warm invocations).
+
+    In sharded storage this is the slim listing index; products in it carry
+    only LISTING_FIELDS, use get_catalog_product() for the full record. Until
+    the first sharded write creates the index, it is derived from the legacy
+    catalog/products.json.
+    The result is shared; use editable_catalog() before changing it.
+    """
     try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=CATALOG_KEY)
-        catalog = json.loads(response['Body'].read().decode('utf-8'))
+        catalog = get_cached_json(CATALOG_INDEX_KEY if is_sharded_catalog() else CATALOG_KEY)
         if 'products' not in catalog:
             catalog['products'] = []
         if 'facets' not in catalog:
             catalog['facets'] = build_catalog_facets(catalog['products'])
         return catalog
     except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            return default_catalog_data()
-        raise
+        if e.response['Error']['Code'] != 'NoSuchKey':
+            raise
+    if is_sharded_catalog():
+        legacy = get_legacy_catalog()
+        if legacy is not None:
+            return catalog_derived('listing', legacy, build_catalog_listing)
+    return default_catalog_data()
+
+def catalog_version():
+    """ETag of the object get_catalog_data() last served from, or None if unknown."""
+    etag = cached_etag(catalog_storage_key())
+    if etag is None and is_sharded_catalog():
+        # Listing derived from the legacy catalog until the index exists
+        etag = cached_etag(CATALOG_KEY)
+    return etag
+
+def catalog_product_version(product):
+    """Version of a full product record from get_catalog_product(): the catalog's, plus its item's when sharded."""
+    if not is_sharded_catalog():
+        return catalog_version()
+    item_etag = cached_etag(catalog_item_key(product)) or cached_etag(CATALOG_KEY)
+    if item_etag is None:
+        return None
+    return f"{catalog_version()}:{item_etag}"
+
+def get_legacy_catalog():
+    """Single-object catalog/products.json, kept as the fallback source while sharding."""
+    catalog = get_optional_json(CATALOG_KEY)
+    if catalog is not None and 'products' not in catalog:
+        catalog['products'] = []
+    return catalog
+
+def get_catalog_product(catalog, idx):
+    """
+    Full product record at a position returned by find_product_index().
+    Sharded products that were never rewritten are read from the legacy catalog.
+    """
+    product = catalog['products'][idx]
+    if not is_sharded_catalog():
+        return product
+
+    item = get_optional_json(catalog_item_key(product))
+    if item is not None:
+        return item
+    legacy = get_legacy_catalog()
+    if legacy is not None:
+        lookup = catalog_derived('legacy-lookup', legacy, lambda c: build_product_lookup(c['products']))
+        pos = lookup.get(str(product.get('product_id')), -1)
+        if pos >= 0:
+            return legacy['products'][pos]
+    return product
 
-def save_catalog_data(catalog):
-    """Persist catalog JSON to S3."""
-    catalog['lastUpdated'] = datetime.utcnow().isoformat() + "Z"
-    catalog['facets'] = build_catalog_facets(catalog.get('products', []))
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=CATALOG_KEY,
-        Body=json.dumps(catalog, indent=2),
-        ContentType='application/json'
+def editable_catalog(catalog):
+    """
+    Copy of the catalog that can be saved without touching the cached one.
+    Product dicts are shared: writers replace them (normalize_product_payload
+    returns a new dict) instead of mutating them in place.
+    """
+    return dict(catalog, products=list(catalog.get('products', [])))
+
+def catalog_storage_key():
+    return CATALOG_INDEX_KEY if is_sharded_catalog() else CATALOG_KEY
+
+def initial_catalog_data():
+    """Starting point for the first write: the legacy catalog's listing when sharding, else empty."""
+    if is_sharded_catalog():
+        legacy = get_legacy_catalog()
+        if legacy is not None:
+            return build_catalog_listing(legacy)
+    return default_catalog_data()
+
+def update_catalog_data(mutate, changed_products=()):
+    """
+    Apply mutate(catalog) -> new catalog | None to the catalog (or, in sharded
+    storage, the listing index) with optimistic concurrency, then refresh the
+    derived sidecars. changed_products are the full records being written, so
+    sharded search documents never have to be rebuilt from slim records.
+    Returns the written catalog, or None if mutate() declined.
+    """
+    def apply(catalog):
+        updated = mutate(catalog)
+        if updated is not None:
+            updated['lastUpdated'] = datetime.utcnow().isoformat() + "Z"
+            updated['facets'] = build_catalog_facets(updated.get('products', []))
+        return updated
+
+    written = update_json_object(
+        catalog_storage_key(),
+        apply,
+        default=initial_catalog_data,
+        indent=None if is_sharded_catalog() else 2
     )
+    if written is None:
+        return None
+
+    # Sidecars are derived data: a failed write only costs an in-memory refresh later.
+    try:
+        save_search_index(written, changed_products)
+    except Exception as e:
+        print(f"WARNING: Failed to update catalog search index: {e}")
+    try:
+        save_related_products(written)
+    except Exception as e:
+        print(f"WARNING: Failed to update related products: {e}")
+    return written
+
+def insert_catalog_product(product):
+    """Add a product unless its id or handle is already taken. Returns False on a duplicate."""
+    def add(catalog):
+        if (
+            find_product_index(catalog, product.get('product_id')) >= 0
+            or find_product_index(catalog, product.get('handle')) >= 0
+        ):
+            return None
+        catalog = editable_catalog(catalog)
+        catalog['products'].append(build_listing_record(product) if is_sharded_catalog() else product)
+        return catalog
+
+    if is_sharded_catalog():
+        try:
+            put_json_object(catalog_item_key(product), product, create_only=True)
+        except ClientError as e:
+            if is_write_conflict(e):
+                return False
+            raise
+
+    if update_catalog_data(add, changed_products=[product]) is None:
+        if is_sharded_catalog():
+            get_s3().delete_object(Bucket=BUCKET_NAME, Key=catalog_item_key(product))
+            invalidate_cached_json(catalog_item_key(product))
+        return False
+    return True
+
+def replace_catalog_product(identifier, change):
+    """
+    Replace one product with change(current_full_record) -> new record.
+    change() may run more than once (on write conflicts) and must not mutate
+    its argument. Returns the new record, or None if the product was not found.
+    """
+    if not is_sharded_catalog():
+        # Filled by the attempt that wins; read by update_catalog_data() after the write.
+        changed = []
+
+        def edit(catalog):
+            idx = find_product_index(catalog, identifier)
+            if idx < 0:
+                return None
+            catalog = editable_catalog(catalog)
+            changed[:] = [change(catalog['products'][idx])]
+            catalog['products'][idx] = changed[0]
+            return catalog
+
+        if update_catalog_data(edit, changed_products=changed) is None:
+            return None
+        return changed[0]
+
+    catalog = get_catalog_data()
+    idx = find_product_index(catalog, identifier)
+    if idx < 0:
+        return None
+    record = catalog['products'][idx]
+    product_id = str(record.get('product_id'))
+
+    def edit_item(item):
+        if item is None:
+            fallback_catalog = get_catalog_data()
+            fallback_idx = find_product_index(fallback_catalog, product_id)
+            item = get_catalog_product(fallback_catalog, fallback_idx) if fallback_idx >= 0 else record
+        return change(item)
+
+    product = update_json_object(catalog_item_key(record), edit_item)
+
+    def edit_index(catalog):
+        pos = find_product_index(catalog, product_id)
+        if pos < 0:
+            return None
+        catalog = editable_catalog(catalog)
+        catalog['products'][pos] = build_listing_record(product)
+        return catalog
+
+    update_catalog_data(edit_index, changed_products=[product])
+    return product
+
+def remove_catalog_product(identifier):
+    """Delete one product. Returns its (listing) record, or None if it was not found."""
+    result = {}
+
+    def remove(catalog):
+        idx = find_product_index(catalog, identifier)
+        if idx < 0:
+            return None
+        catalog = editable_catalog(catalog)
+        result['product'] = catalog['products'].pop(idx)
+        return catalog
+
+    if update_catalog_data(remove) is None:
+        return None
+    record = result['product']
+    if is_sharded_catalog():
+        get_s3().delete_object(Bucket=BUCKET_NAME, Key=catalog_item_key(record))
+        invalidate_cached_json(catalog_item_key(record))
+    return record
 
 def normalize_to_list(value):
     if value is None:
@@ -159,7 +722,12 @@ def normalize_product_payload(payload, existing_product=None):
                 if isinstance(item, dict):
                     url = str(item.get('url', '')).strip()
                     if url:
-                        normalized_gallery.append({'url': url, 'alt': item.get('alt', '')})
+                        image = {'url': url, 'alt': item.get('alt', '')}
+                        # Keep what process_upload recorded (srcset variants, dimensions, source URL, video poster/preview)
+                        for key in GALLERY_IMAGE_EXTRA_FIELDS:
+                            if item.get(key):
+                                image[key] = item[key]
+                        normalized_gallery.append(image)
                 elif isinstance(item, str) and item.strip():
                     normalized_gallery.append({'url': item.strip(), 'alt': ''})
             product['gallery_images'] = normalized_gallery
@@ -241,12 +809,19 @@ def build_catalog_facets(products):
         ]
     }
 
-def find_product_index(products, product_id_or_handle):
-    target = str(product_id_or_handle)
-    for idx, product in enumerate(products):
-        if str(product.get('product_id')) == target or str(product.get('handle')) == target:
-            return idx
-    return -1
+def build_product_lookup(products):
+    """Map str(product_id) and str(handle) to list positions; the first product wins on clashes."""
+    lookup = {}
+    for pos in range(len(products) - 1, -1, -1):
+        product = products[pos]
+        lookup[str(product.get('handle'))] = pos
+        lookup[str(product.get('product_id'))] = pos
+    return lookup
+
+def find_product_index(catalog, product_id_or_handle):
+    """Position of a product by id or handle via the catalog's lookup table, or -1."""
+    lookup = catalog_derived('lookup', catalog, lambda c: build_product_lookup(c.get('products', [])))
+    return lookup.get(str(product_id_or_handle), -1)
 
 def generate_product_upload_urls(product_id_or_handle, files):
     urls = []
@@ -260,88 +835,484 @@ def generate_product_upload_urls(product_id_or_handle, files):
         key = f"uploads/products/{product_id_or_handle}/{folder}/{filename}"
 
         try:
-            url = s3.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': BUCKET_NAME,
-                    'Key': key
-                },
-                ExpiresIn=3600
-            )
-            urls.append({
-                'filename': filename,
-                'uploadUrl': url,
-                's3Key': key,
-                'contentType': file_info.get('contentType', 'application/octet-stream')
-            })
+            urls.append(presign_upload(key, file_info))
         except Exception as e:
             print(f"Error generating product upload URL for {filename}: {e}")
             continue
 
     return urls
 
+def parse_price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+CATALOG_SORTS = {
+    'title_asc': (lambda p: str(p.get('title', '')).lower(), False),
+    'title_desc': (lambda p: str(p.get('title', '')).lower(), True),
+    'newest': (lambda p: str(p.get('created_at', '')), True),
+    'oldest': (lambda p: str(p.get('created_at', '')), False),
+    'price_desc': (lambda p: parse_price(p.get('price')) or 0.0, True),
+    'price_asc': (lambda p: parse_price(p.get('price')) or 0.0, False),
+}
+
+# Structures derived from a catalog object (index, search postings, related products),
+# keyed by name. Rebuilt whenever the cache hands out a new catalog version.
+_catalog_derived = {}
+
+def catalog_derived(name, catalog, build):
+    entry = _catalog_derived.get(name)
+    if entry is None or entry['source'] is not catalog:
+        entry = {'source': catalog, 'value': build(catalog)}
+        _catalog_derived[name] = entry
+    return entry['value']
+
+def build_catalog_index(products):
+    """
+    Precompute everything list_catalog_products() needs to filter and sort:
+    posting sets (product positions) per facet value, a price-sorted array for
+    range queries and one pre-sorted ordering per sort mode.
+    """
+    by_collection = {}
+    by_material = {}
+    by_selling_type = {}
+    by_availability = {'available': set(), 'unavailable': set()}
+    prices = []
+
+    for pos, product in enumerate(products):
+        for name in normalize_to_list(product.get('collections', [])):
+            by_collection.setdefault(name.lower(), set()).add(pos)
+
+        material = str(product.get('material', '')).strip().lower()
+        by_material.setdefault(material, set()).add(pos)
+
+        selling_type = str(product.get('selling_type', '')).strip().lower()
+        by_selling_type.setdefault(selling_type, set()).add(pos)
+
+        availability = 'available' if bool(product.get('available', True)) else 'unavailable'
+        by_availability[availability].add(pos)
+
+        prices.append((parse_price(product.get('price')) or 0.0, pos))
+
+    prices.sort()
+    orderings = {
+        sort: sorted(range(len(products)), key=lambda pos, k=key: k(products[pos]), reverse=reverse)
+        for sort, (key, reverse) in CATALOG_SORTS.items()
+    }
+
+    title_rank = [0] * len(products)
+    for rank, pos in enumerate(orderings['title_asc']):
+        title_rank[pos] = rank
+
+    return {
+        'products': products,
+        'collection': by_collection,
+        'material': by_material,
+        'selling_type': by_selling_type,
+        'availability': by_availability,
+        'priceValues': [price for price, _ in prices],
+        'pricePositions': [pos for _, pos in prices],
+        'orderings': orderings,
+        'titleRank': title_rank,
+        'positions': {str(product.get('product_id')): pos for pos, product in enumerate(products)},
+    }
+
+def get_catalog_index(catalog):
+    """Return the index for this catalog object, building it once per catalog version."""
+    return catalog_derived('index', catalog, lambda c: build_catalog_index(c.get('products', [])))
+
+def price_range_positions(index, min_price, max_price):
+    values = index['priceValues']
+    lo = bisect.bisect_left(values, min_price) if min_price is not None else 0
+    hi = bisect.bisect_right(values, max_price) if max_price is not None else len(values)
+    return set(index['pricePositions'][lo:hi])
+
+# Field weights for full-text search; filter_* fields share FILTER_FIELD_WEIGHT.
+SEARCH_FIELD_WEIGHTS = {
+    'title': 5,
+    'product_number': 5,
+    'handle': 3,
+    'collections': 2,
+    'tags': 2,
+    'material': 2,
+    'description_paragraphs': 1,
+}
+FILTER_FIELD_WEIGHT = 2
+SEARCH_MAX_QUERY_TOKENS = 8
+SEARCH_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+# Queries with punctuation (SKUs, handles like "h-1") must also contain the query verbatim in one of these
+SEARCH_LITERAL_FIELDS = ('title', 'product_number', 'handle')
+SEARCH_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]', re.UNICODE)
+
+def tokenize(text):
+    return SEARCH_TOKEN_PATTERN.findall(str(text).lower())
+
+def search_field_text(value):
+    if isinstance(value, list):
+        return ' '.join(search_field_text(v) for v in value)
+    if isinstance(value, dict):
+        return ' '.join(search_field_text(v) for v in value.values())
+    return '' if value is None else str(value)
+
+def build_search_terms(product):
+    """Map every token of a product's searchable fields to its highest field weight."""
+    terms = {}
+    fields = list(SEARCH_FIELD_WEIGHTS.items()) + [
+        (key, FILTER_FIELD_WEIGHT) for key in product if key.startswith('filter_')
+    ]
+    for field, weight in fields:
+        for token in tokenize(search_field_text(product.get(field))):
+            if terms.get(token, 0) < weight:
+                terms[token] = weight
+    return terms
+
+def search_document_stamp(product):
+    return str(product.get('updated_at') or product.get('created_at') or '')
+
+def update_search_documents(documents, products, refresh_stale=True):
+    """
+    Bring per-product search documents in line with the catalog, re-tokenizing
+    only products whose updated_at stamp changed. Unchanged entries are reused.
+    With refresh_stale=False (slim listing records) existing documents are kept
+    as they are and only missing products are tokenized.
+    """
+    documents = documents or {}
+    updated = {}
+    for product in products:
+        key = str(product.get('product_id'))
+        stamp = search_document_stamp(product)
+        existing = documents.get(key)
+        if existing and (existing.get('stamp') == stamp or not refresh_stale):
+            updated[key] = existing
+        else:
+            updated[key] = {'stamp': stamp, 'terms': build_search_terms(product)}
+    return updated
+
+def search_source_documents(persisted):
+    """
+    Starting documents for an index refresh. A sharded catalog without a
+    persisted index is seeded from the legacy full catalog, since listing
+    records lack descriptions, tags and filter fields.
+    """
+    documents = persisted.get('documents')
+    if documents is None and is_sharded_catalog():
+        legacy = get_legacy_catalog()
+        if legacy is not None:
+            documents = update_search_documents(None, legacy['products'])
+    return documents
+
+def save_search_index(catalog, changed_products=()):
+    """Incrementally rebuild and persist the search index next to the catalog."""
+    persisted = get_optional_json(SEARCH_INDEX_KEY) or {}
+    documents = update_search_documents(
+        search_source_documents(persisted),
+        catalog.get('products', []),
+        refresh_stale=not is_sharded_catalog()
+    )
+    for product in changed_products:
+        documents[str(product.get('product_id'))] = {
+            'stamp': search_document_stamp(product),
+            'terms': build_search_terms(product),
+        }
+    put_json_object(SEARCH_INDEX_KEY, {
+        'version': 1,
+        'catalogUpdated': catalog.get('lastUpdated'),
+        'documents': documents,
+    }, indent=None)
+
+def compile_search_index(catalog):
+    """Turn persisted per-product documents into in-memory postings for this catalog version."""
+    products = catalog.get('products', [])
+    try:
+        persisted = get_optional_json(SEARCH_INDEX_KEY) or {}
+    except Exception as e:
+        print(f"WARNING: Could not load catalog search index, rebuilding in memory: {e}")
+        persisted = {}
+
+    documents = persisted.get('documents')
+    if persisted.get('catalogUpdated') != catalog.get('lastUpdated') or len(documents or {}) != len(products):
+        documents = update_search_documents(
+            search_source_documents(persisted),
+            products,
+            refresh_stale=not is_sharded_catalog()
+        )
+
+    positions = get_catalog_index(catalog)['positions']
+    postings = {}
+    for key, document in documents.items():
+        pos = positions.get(key)
+        if pos is None:
+            continue
+        for term, weight in document['terms'].items():
+            postings.setdefault(term, {})[pos] = weight
+
+    return {'postings': postings, 'vocabulary': sorted(postings)}
+
+def get_search_index(catalog):
+    return catalog_derived('search', catalog, compile_search_index)
+
+def literal_search_scores(catalog, query):
+    """
+    {position: weight} of products whose title, product number or handle
+    contain query verbatim, weighted by the best such field.
+    """
+    scores = {}
+    for pos, product in enumerate(get_catalog_index(catalog)['products']):
+        for field in SEARCH_LITERAL_FIELDS:
+            if query in str(product.get(field, '')).lower():
+                scores[pos] = max(scores.get(pos, 0), SEARCH_FIELD_WEIGHTS[field])
+    return scores
+
+def search_catalog(catalog, query):
+    """
+    Ranked prefix search. Every query token must prefix-match a term of the
+    product; each token contributes its best field weight, doubled for an
+    exact term match. Queries containing punctuation instead match products
+    whose title, product number or handle contain the query verbatim, so
+    "h-1" is not widened to every "h*" and "1*" product. Returns {position: score}.
+    """
+    tokens = tokenize(query)[:SEARCH_MAX_QUERY_TOKENS]
+    if not tokens:
+        return {}
+
+    literal = query.strip().lower()
+    if SEARCH_PUNCTUATION_PATTERN.search(literal):
+        token_scores = rank_search_tokens(catalog, tokens)
+        return {
+            pos: max(weight, token_scores.get(pos, 0))
+            for pos, weight in literal_search_scores(catalog, literal).items()
+        }
+    return rank_search_tokens(catalog, tokens)
+
+def rank_search_tokens(catalog, tokens):
+    """Scores of products matching every token by prefix (see search_catalog)."""
+    index = get_search_index(catalog)
+    vocabulary = index['vocabulary']
+    scores = None
+    for token in tokens:
+        token_scores = {}
+        start = bisect.bisect_left(vocabulary, token)
+        for term in vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            boost = 2 if term == token else 1
+            for pos, weight in index['postings'][term].items():
+                score = weight * boost
+                if token_scores.get(pos, 0) < score:
+                    token_scores[pos] = score
+
+        if scores is None:
+            scores = token_scores
+        else:
+            scores = {pos: score + token_scores[pos] for pos, score in scores.items() if pos in token_scores}
+        if not scores:
+            return {}
+    return scores
+
+def related_features(product):
+    collections = frozenset(name.lower() for name in normalize_to_list(product.get('collections', [])))
+    material = str(product.get('material', '')).strip().lower()
+    return {'collections': collections, 'material': material, 'title': str(product.get('title', '')).lower()}
+
+def related_signature(features):
+    return '|'.join(sorted(features['collections'])) + '#' + features['material'] + '#' + features['title']
+
+def related_score(a, b):
+    """Two points per shared collection, one for the same (non-empty) material."""
+    score = 2 * len(a['collections'] & b['collections'])
+    if a['material'] and a['material'] == b['material']:
+        score += 1
+    return score
+
+def update_related_products(previous, products):
+    """
+    Bring the related-products adjacency table in line with the catalog.
+
+    Only rows that can have changed are recomputed: products whose
+    collections/material/title changed, products whose current row points at
+    a changed or removed product, and products sharing a collection or
+    material with a changed product. Without a previous table every row is built.
+    """
+    previous = previous or {}
+    old_signatures = previous.get('signatures') or {}
+    old_related = previous.get('related') or {}
+
+    features = {}
+    signatures = {}
+    by_collection = {}
+    by_material = {}
+    for product in products:
+        key = str(product.get('product_id'))
+        item = related_features(product)
+        features[key] = item
+        signatures[key] = related_signature(item)
+        for name in item['collections']:
+            by_collection.setdefault(name, set()).add(key)
+        if item['material']:
+            by_material.setdefault(item['material'], set()).add(key)
+
+    changed = {key for key, sig in signatures.items() if old_signatures.get(key) != sig}
+    changed |= {key for key in old_signatures if key not in signatures}
+
+    if not old_related:
+        dirty = set(signatures)
+    else:
+        dirty = {key for key in changed if key in signatures}
+        for key, row in old_related.items():
+            if key in signatures and any(other in changed for other in row):
+                dirty.add(key)
+        for key in changed:
+            item = features.get(key)
+            if item is None:
+                continue
+            for name in item['collections']:
+                dirty |= by_collection.get(name, set())
+            if item['material']:
+                dirty |= by_material.get(item['material'], set())
+
+    related = {key: row for key, row in old_related.items() if key in signatures and key not in dirty}
+    for key in dirty:
+        item = features[key]
+        candidates = set()
+        for name in item['collections']:
+            candidates |= by_collection.get(name, set())
+        if item['material']:
+            candidates |= by_material.get(item['material'], set())
+        candidates.discard(key)
+        related[key] = heapq.nsmallest(
+            RELATED_PRODUCTS_LIMIT,
+            candidates,
+            key=lambda other: (-related_score(item, features[other]), features[other]['title'], other)
+        )
+
+    return {'signatures': signatures, 'related': related}
+
+def save_related_products(catalog):
+    """Incrementally update and persist the related-products sidecar."""
+    table = update_related_products(get_optional_json(RELATED_PRODUCTS_KEY), catalog.get('products', []))
+    put_json_object(RELATED_PRODUCTS_KEY, {
+        'version': 1,
+        'catalogUpdated': catalog.get('lastUpdated'),
+        **table,
+    }, indent=None)
+
+def compile_related_products(catalog):
+    try:
+        table = get_optional_json(RELATED_PRODUCTS_KEY) or {}
+    except Exception as e:
+        print(f"WARNING: Could not load related products, rebuilding in memory: {e}")
+        table = {}
+    products = catalog.get('products', [])
+    # A missing sidecar and a legacy catalog without lastUpdated both give None; check coverage too
+    if (table.get('catalogUpdated') != catalog.get('lastUpdated')
+            or len(table.get('signatures') or {}) != len(products)):
+        table = update_related_products(table, products)
+    return table.get('related') or {}
+
+def get_related_products(catalog, product):
+    """Related products for a catalog product, read from the precomputed adjacency table."""
+    related = catalog_derived('related', catalog, compile_related_products)
+    positions = get_catalog_index(catalog)['positions']
+    products = catalog.get('products', [])
+    return [
+        products[positions[key]]
+        for key in related.get(str(product.get('product_id')), [])
+        if key in positions
+    ]
+
+def project_product(product, fields):
+    """Copy of a product with only the given fields, each value whole."""
+    return {key: product[key] for key in fields if key in product}
+
+def card_product(product):
+    """A product as a catalog grid tile: see CATALOG_PROJECTIONS['card']."""
+    record = project_product(product, CATALOG_PROJECTIONS['card'])
+    if isinstance(record.get('gallery_images'), list):
+        record['gallery_images'] = [
+            {key: image[key] for key in CARD_GALLERY_IMAGE_FIELDS if key in image}
+            if isinstance(image, dict) else image
+            for image in record['gallery_images'][:LISTING_GALLERY_IMAGES]
+        ]
+    return record
+
+# How each named projection shapes a product
+CATALOG_PROJECTION_BUILDERS = {'card': card_product}
+
+def parse_fields_param(value):
+    """
+    fields= query parameter: a CATALOG_PROJECTIONS name, a comma-separated
+    field list (product_id and handle are always kept), or empty/"full" for
+    whole records. Named projections may trim values (card keeps two gallery
+    images); listed fields are copied untrimmed from the listing record (with
+    CATALOG_STORAGE=sharded that is the slim index record, as for full
+    listings). Returns a projection name, a field tuple, or None.
+    """
+    value = (value or '').strip()
+    if not value or value.lower() == 'full':
+        return None
+    if value.lower() in CATALOG_PROJECTIONS:
+        return value.lower()
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    return tuple(dict.fromkeys(['product_id', 'handle'] + fields))
+
+def projected_products(catalog, projection):
+    """Every product under a named projection, in catalog order (built once per catalog version)."""
+    build = CATALOG_PROJECTION_BUILDERS[projection]
+    return catalog_derived(
+        f'projection:{projection}', catalog,
+        lambda c: [build(product) for product in c.get('products', [])]
+    )
+
 def list_catalog_products(catalog, query_params):
-    products = list(catalog.get('products', []))
+    index = get_catalog_index(catalog)
+    products = index['products']
 
     search = (query_params.get('search') or '').strip().lower()
+    if not tokenize(search):
+        # Nothing searchable (e.g. "-" or "/"): list everything, as without a search
+        search = ''
     collection = (query_params.get('collection') or '').strip().lower()
     material = (query_params.get('material') or '').strip().lower()
     selling_type = (query_params.get('selling_type') or '').strip().lower()
     availability = (query_params.get('availability') or '').strip().lower()
     min_price_raw = (query_params.get('min_price') or '').strip()
     max_price_raw = (query_params.get('max_price') or '').strip()
-    sort = (query_params.get('sort') or 'title_asc').strip().lower()
-
-    def parse_price(value):
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return None
+    sort = (query_params.get('sort') or ('relevance' if search else 'title_asc')).strip().lower()
 
     min_price = parse_price(min_price_raw) if min_price_raw else None
     max_price = parse_price(max_price_raw) if max_price_raw else None
 
-    if search:
-        products = [
-            p for p in products
-            if search in str(p.get('title', '')).lower()
-            or search in str(p.get('handle', '')).lower()
-            or search in str(p.get('product_number', '')).lower()
-        ]
-
+    # Intersect posting sets; None means "no constraint yet" (every product matches).
+    postings = []
     if collection:
-        products = [
-            p for p in products
-            if any(collection == str(c).strip().lower() for c in normalize_to_list(p.get('collections', [])))
-        ]
-
+        postings.append(index['collection'].get(collection, set()))
     if material:
-        products = [p for p in products if material == str(p.get('material', '')).strip().lower()]
-
+        postings.append(index['material'].get(material, set()))
     if selling_type:
-        products = [p for p in products if selling_type == str(p.get('selling_type', '')).strip().lower()]
-
+        postings.append(index['selling_type'].get(selling_type, set()))
     if availability in ('available', 'unavailable'):
-        wants_available = availability == 'available'
-        products = [p for p in products if bool(p.get('available', True)) == wants_available]
-
-    if min_price is not None:
-        products = [p for p in products if (parse_price(p.get('price')) or 0.0) >= min_price]
-    if max_price is not None:
-        products = [p for p in products if (parse_price(p.get('price')) or 0.0) <= max_price]
-
-    if sort == 'title_desc':
-        products.sort(key=lambda p: str(p.get('title', '')).lower(), reverse=True)
-    elif sort == 'newest':
-        products.sort(key=lambda p: str(p.get('created_at', '')), reverse=True)
-    elif sort == 'oldest':
-        products.sort(key=lambda p: str(p.get('created_at', '')))
-    elif sort == 'price_desc':
-        products.sort(key=lambda p: parse_price(p.get('price')) or 0.0, reverse=True)
-    elif sort == 'price_asc':
-        products.sort(key=lambda p: parse_price(p.get('price')) or 0.0)
+        postings.append(index['availability'][availability])
+    if min_price is not None or max_price is not None:
+        postings.append(price_range_positions(index, min_price, max_price))
+
+    candidates = None
+    for posting in sorted(postings, key=len):
+        candidates = set(posting) if candidates is None else candidates & posting
+        if not candidates:
+            break
+
+    scores = {}
+    if search:
+        scores = search_catalog(catalog, search)
+        candidates = set(scores) if candidates is None else candidates & scores.keys()
+
+    if sort == 'relevance' and search:
+        # Best score first; ties keep title order.
+        title_rank = index['titleRank']
+        ordering = sorted(candidates, key=lambda pos: (-scores[pos], title_rank[pos]))
     else:
-        products.sort(key=lambda p: str(p.get('title', '')).lower())
+        ordering = index['orderings'].get(sort, index['orderings']['title_asc'])
 
     page = query_params.get('page', '1')
     page_size = query_params.get('page_size', '24')
@@ -354,7 +1325,7 @@ def list_catalog_products(catalog, query_params):
     except (TypeError, ValueError):
         page_size = 24
 
-    total_items = len(products)
+    total_items = len(products) if candidates is None else len(candidates)
     total_pages = max(1, (total_items + page_size - 1) // page_size)
     if page > total_pages:
         page = total_pages
@@ -362,8 +1333,31 @@ def list_catalog_products(catalog, query_params):
     start = (page - 1) * page_size
     end = start + page_size
 
-    return {
-        'products': products[start:end],
+    if candidates is None:
+        page_positions = ordering[start:end]
+    else:
+        page_positions = []
+        seen = 0
+        for pos in ordering:
+            if pos not in candidates:
+                continue
+            if seen >= start:
+                page_positions.append(pos)
+                if len(page_positions) >= page_size:
+                    break
+            seen += 1
+
+    projection = parse_fields_param(query_params.get('fields'))
+    if projection is None:
+        page_products = [products[pos] for pos in page_positions]
+    elif isinstance(projection, str):
+        records = projected_products(catalog, projection)
+        page_products = [records[pos] for pos in page_positions]
+    else:
+        page_products = [project_product(products[pos], projection) for pos in page_positions]
+
+    result = {
+        'products': page_products,
         'pagination': {
             'page': page,
             'pageSize': page_size,
@@ -380,36 +1374,325 @@ def list_catalog_products(catalog, query_params):
             'max_price': max_price,
             'sort': sort,
         },
-        'facets': catalog.get('facets', build_catalog_facets(catalog.get('products', [])))
     }
+    # Facets describe the whole catalog, not the page: projected (fields=) listings send
+    # them with page 1 only, or when asked for with facets=true
+    if projection is None or page == 1 or (query_params.get('facets') or '').strip().lower() == 'true':
+        result['facets'] = catalog.get('facets') or build_catalog_facets(catalog.get('products', []))
+    return result
 
 def get_project_metadata(category, project_id):
     """Fetch project metadata from S3"""
     key = f"projects/{category}/{project_id}/metadata.json"
     try:
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+        response = get_s3().get_object(Bucket=BUCKET_NAME, Key=key)
         return json.loads(response['Body'].read().decode('utf-8'))
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             return None
         raise
 
-def save_project_metadata(category, project_id, metadata):
-    """Save project metadata to S3"""
+def get_project_metadata_batch(refs):
+    """
+    Fetch metadata.json for many (category, project_id) pairs concurrently.
+    Returns one entry per ref, in order: {'category', 'id', 'found', 'project'}
+    where project is the metadata, or None when it does not exist.
+    """
+    def fetch(ref):
+        category, project_id = ref
+        metadata = get_project_metadata(category, project_id)
+        return {'category': category, 'id': project_id, 'found': metadata is not None, 'project': metadata}
+
+    if len(refs) <= 1:
+        return [fetch(ref) for ref in refs]
+    with ThreadPoolExecutor(max_workers=min(BATCH_READ_CONCURRENCY, len(refs))) as executor:
+        return list(executor.map(fetch, refs))
+
+def parse_project_refs(items):
+    """
+    Validate the projects list of a batch request: [{"category", "id"}, ...].
+    Returns (refs, error); duplicates are dropped, order is kept.
+    """
+    if not isinstance(items, list) or not items:
+        return None, 'Body must contain a non-empty "projects" list of {category, id}'
+    if len(items) > BATCH_MAX_PROJECTS:
+        return None, f'At most {BATCH_MAX_PROJECTS} projects per request'
+    refs = {}
+    for item in items:
+        category = str(item.get('category', '')).strip() if isinstance(item, dict) else ''
+        project_id = str(item.get('id', '')).strip() if isinstance(item, dict) else ''
+        if not category or not project_id or '/' in category + project_id or '..' in category + project_id:
+            return None, f'Invalid project reference: {item}'
+        refs.setdefault((category, project_id))
+    return list(refs), None
+
+def save_project_metadata(category, project_id, metadata, create_only=False):
+    """Save project metadata to S3; create_only fails with PreconditionFailed if it exists"""
     key = f"projects/{category}/{project_id}/metadata.json"
-    s3.put_object(
+    put_json_object(key, metadata, create_only=create_only)
+
+def update_project_metadata(category, project_id, mutate):
+    """
+    Apply mutate(metadata or None) -> new metadata | None with optimistic
+    concurrency (see update_json_object). Returns the written metadata.
+    """
+    key = f"projects/{category}/{project_id}/metadata.json"
+    return update_json_object(key, mutate)
+
+def delete_object_batch(keys):
+    """One DeleteObjects call. Returns (deleted count, [{'key', 'code', 'message'}])."""
+    try:
+        response = get_s3().delete_objects(
+            Bucket=BUCKET_NAME,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+        )
+    except ClientError as e:
+        error = e.response.get('Error', {})
+        return 0, [{'key': key, 'code': error.get('Code'), 'message': error.get('Message')} for key in keys]
+    errors = [
+        {'key': item.get('Key'), 'code': item.get('Code'), 'message': item.get('Message')}
+        for item in response.get('Errors', [])
+    ]
+    return len(keys) - len(errors), errors
+
+def delete_s3_folder(prefix):
+    """
+    Delete all objects with given prefix: one DeleteObjects call per listing
+    page of up to 1,000 keys, DELETE_CONCURRENCY of them running while the
+    listing continues. Returns {'deleted': count, 'errors': [{'key', 'code', 'message'}]}.
+    """
+    deleted = 0
+    errors = []
+    paginator = get_s3().get_paginator('list_objects_v2')
+    with ThreadPoolExecutor(max_workers=DELETE_CONCURRENCY) as executor:
+        futures = []
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix,
+                                       PaginationConfig={'PageSize': S3_DELETE_BATCH_SIZE}):
+            keys = [obj['Key'] for obj in page.get('Contents', [])]
+            if keys:
+                futures.append(executor.submit(delete_object_batch, keys))
+        for future in futures:
+            count, batch_errors = future.result()
+            deleted += count
+            errors.extend(batch_errors)
+
+    if errors:
+        print(f"ERROR: {len(errors)} objects under {prefix} could not be deleted, e.g. {errors[0]}")
+    return {'deleted': deleted, 'errors': errors}
+
+def delete_s3_prefixes(prefixes):
+    """delete_s3_folder() for each prefix, with the results added up."""
+    result = {'deleted': 0, 'errors': []}
+    for prefix in prefixes:
+        print(f"Deleting S3 folder with prefix: {prefix}")
+        folder = delete_s3_folder(prefix)
+        result['deleted'] += folder['deleted']
+        result['errors'].extend(folder['errors'])
+    return result
+
+def prefixes_exceed(prefixes, limit):
+    """True if the prefixes hold more than limit objects (stops listing once they do)."""
+    remaining = limit
+    paginator = get_s3().get_paginator('list_objects_v2')
+    for prefix in prefixes:
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix,
+                                       PaginationConfig={'PageSize': S3_DELETE_BATCH_SIZE}):
+            remaining -= len(page.get('Contents', []))
+            if remaining < 0:
+                return True
+    return False
+
+def can_run_jobs():
+    """Background jobs are asynchronous invocations of this function, so only inside Lambda."""
+    return bool(os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+def job_key(job_id):
+    return f"{JOBS_PREFIX}{job_id}.json"
+
+def start_delete_job(prefixes):
+    """
+    Record a delete job in S3 and hand it to an asynchronous invocation.
+    Returns the job, or None if the invocation could not be started (the
+    job is then marked failed and the caller should delete inline).
+    """
+    job = {
+        'jobId': uuid.uuid4().hex,
+        'type': 'delete',
+        'status': 'running',
+        'prefixes': prefixes,
+        'createdAt': datetime.utcnow().isoformat() + 'Z'
+    }
+    put_json_object(job_key(job['jobId']), job)
+    try:
+        get_lambda_client().invoke(
+            FunctionName=os.environ['AWS_LAMBDA_FUNCTION_NAME'],
+            InvocationType='Event',
+            Payload=json.dumps({'action': 'delete_prefixes', 'jobId': job['jobId'], 'prefixes': prefixes}).encode('utf-8')
+        )
+    except Exception as e:
+        # e.g. the role lacks lambda:InvokeFunction on this function
+        print(f"ERROR: Could not start delete job {job['jobId']}: {e}")
+        put_json_object(job_key(job['jobId']), dict(job, status='failed', error=f"Could not start job: {e}",
+                                                     finishedAt=datetime.utcnow().isoformat() + 'Z'))
+        return None
+    print(f"Started delete job {job['jobId']} for {prefixes}")
+    return job
+
+def run_delete_job(event):
+    """Asynchronous invocation started by start_delete_job(): delete, then record the outcome."""
+    job_id = event['jobId']
+    job = dict(get_optional_json(job_key(job_id)) or {'jobId': job_id, 'type': 'delete', 'prefixes': event['prefixes']})
+    try:
+        result = delete_s3_prefixes(event['prefixes'])
+    except Exception as e:
+        put_json_object(job_key(job_id), dict(job, status='failed', error=str(e),
+                                              finishedAt=datetime.utcnow().isoformat() + 'Z'))
+        # Deletes are idempotent; let Lambda's async retries have another go
+        raise
+
+    put_json_object(job_key(job_id), dict(
+        job,
+        status='failed' if result['errors'] else 'succeeded',
+        deleted=result['deleted'],
+        errorCount=len(result['errors']),
+        errors=result['errors'][:MAX_REPORTED_ERRORS],
+        finishedAt=datetime.utcnow().isoformat() + 'Z'
+    ))
+    print(f"Delete job {job_id} finished: {result['deleted']} deleted, {len(result['errors'])} errors")
+    return {'jobId': job_id, 'deleted': result['deleted'], 'errorCount': len(result['errors'])}
+
+def presign_upload(key, file_info):
+    """
+    Upload entry for one file: a presigned PUT URL, or for large files
+    (file_info size >= MULTIPART_THRESHOLD_BYTES) a multipart plan. The S3
+    multipart upload is only created by /uploads/multipart/create, so URLs
+    requested for a form that is never submitted leave nothing behind.
+    """
+    entry = {
+        'filename': file_info.get('filename', ''),
+        's3Key': key,
+        'contentType': file_info.get('contentType', 'application/octet-stream')
+    }
+    try:
+        size = int(file_info.get('size') or 0)
+    except (TypeError, ValueError):
+        size = 0
+
+    if size < MULTIPART_THRESHOLD_BYTES:
+        # Generate presigned URL without ContentType to avoid CORS issues
+        # S3 will infer content type from file extension
+        entry['uploadUrl'] = get_s3().generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': BUCKET_NAME,
+                'Key': key
+            },
+            ExpiresIn=UPLOAD_URL_EXPIRES
+        )
+        return entry
+
+    part_size = max(MULTIPART_PART_SIZE, -(-size // MULTIPART_MAX_PARTS))
+    entry.update(multipart=True, partSize=part_size, partCount=-(-size // part_size))
+    return entry
+
+def presign_upload_parts(key, upload_id, part_numbers):
+    return [
+        {
+            'partNumber': part_number,
+            'uploadUrl': get_s3().generate_presigned_url(
+                'upload_part',
+                Params={'Bucket': BUCKET_NAME, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+                ExpiresIn=UPLOAD_URL_EXPIRES
+            )
+        }
+        for part_number in part_numbers
+    ]
+
+def list_uploaded_parts(key, upload_id):
+    """Parts S3 has stored for a multipart upload: [{'PartNumber', 'ETag', 'Size'}], in order."""
+    parts = []
+    paginator = get_s3().get_paginator('list_parts')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Key=key, UploadId=upload_id):
+        parts.extend(page.get('Parts', []))
+    return sorted(parts, key=lambda part: part['PartNumber'])
+
+def parse_multipart_request(body, needs_upload_id=True):
+    """(s3Key, uploadId, error) from a /uploads/multipart/* body; only keys under uploads/ are accepted."""
+    key = str(body.get('s3Key') or '')
+    upload_id = str(body.get('uploadId') or '')
+    if not key.startswith('uploads/') or '..' in key or (needs_upload_id and not upload_id):
+        return None, None, 'Missing or invalid s3Key/uploadId'
+    return key, upload_id, None
+
+def parse_part_number(value):
+    """A valid S3 part number (1..MULTIPART_MAX_PARTS) as int, or None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if 1 <= number <= MULTIPART_MAX_PARTS and str(number) == str(value).strip() else None
+
+def handle_multipart_request(action, body):
+    """POST /uploads/multipart/{create,parts,complete,abort}. Returns an API response."""
+    if not isinstance(body, dict):
+        return cors_response(400, {'error': 'Body must be a JSON object'})
+    key, upload_id, error = parse_multipart_request(body, needs_upload_id=action != 'create')
+    if error:
+        return cors_response(400, {'error': error})
+
+    if action in ('create', 'complete'):
+        part_count = parse_part_number(body.get('partCount'))
+        if part_count is None:
+            return cors_response(400, {'error': f'partCount must be a whole number from 1 to {MULTIPART_MAX_PARTS}'})
+
+    if action == 'create':
+        upload_id = get_s3().create_multipart_upload(
+            Bucket=BUCKET_NAME,
+            Key=key,
+            ContentType=str(body.get('contentType') or 'application/octet-stream')
+        )['UploadId']
+        return cors_response(200, {
+            's3Key': key,
+            'uploadId': upload_id,
+            'parts': presign_upload_parts(key, upload_id, range(1, part_count + 1))
+        })
+
+    if action == 'abort':
+        get_s3().abort_multipart_upload(Bucket=BUCKET_NAME, Key=key, UploadId=upload_id)
+        return cors_response(200, {'message': 'Upload aborted', 's3Key': key})
+
+    uploaded = list_uploaded_parts(key, upload_id)
+
+    if action == 'parts':
+        # Resuming: skip what S3 already has, re-sign the rest (URLs may have expired)
+        requested = body.get('partNumbers')
+        numbers = [parse_part_number(n) for n in requested] if isinstance(requested, list) else [None]
+        if None in numbers:
+            return cors_response(400, {'error': f'partNumbers must be a list of whole numbers from 1 to {MULTIPART_MAX_PARTS}'})
+        done = {part['PartNumber'] for part in uploaded}
+        wanted = [n for n in dict.fromkeys(numbers) if n not in done]
+        return cors_response(200, {
+            'uploadedParts': [{'partNumber': p['PartNumber'], 'size': p['Size']} for p in uploaded],
+            'parts': presign_upload_parts(key, upload_id, wanted)
+        })
+
+    # complete: assemble from S3's own part list, so the browser never has to read ETag headers
+    # Completing with parts missing would publish (and process) a truncated file
+    if [p['PartNumber'] for p in uploaded] != list(range(1, part_count + 1)):
+        return cors_response(409, {
+            'error': 'Upload is missing parts',
+            'uploadedParts': [p['PartNumber'] for p in uploaded]
+        })
+    get_s3().complete_multipart_upload(
         Bucket=BUCKET_NAME,
         Key=key,
-        Body=json.dumps(metadata, indent=2),
-        ContentType='application/json'
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [{'PartNumber': p['PartNumber'], 'ETag': p['ETag']} for p in uploaded]}
     )
-
-def delete_s3_folder(prefix):
-    """Delete all objects with given prefix"""
-    paginator = s3.get_paginator('list_objects_v2')
-    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix):
-        for obj in page.get('Contents', []):
-            s3.delete_object(Bucket=BUCKET_NAME, Key=obj['Key'])
+    print(f"Completed multipart upload of {key} ({len(uploaded)} parts)")
+    return cors_response(200, {'message': 'Upload completed', 's3Key': key})
 
 def generate_upload_urls(category, project_id, files):
     """Generate presigned URLs for file uploads"""
@@ -427,22 +1710,7 @@ def generate_upload_urls(category, project_id, files):
             key = f"uploads/{category}/{project_id}/original/{filename}"
         
         try:
-            # Generate presigned URL without ContentType to avoid CORS issues
-            # S3 will infer content type from file extension
-            url = s3.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': BUCKET_NAME,
-                    'Key': key
-                },
-                ExpiresIn=3600  # 1 hour
-            )
-            urls.append({
-                'filename': filename,
-                'uploadUrl': url,
-                's3Key': key,
-                'contentType': file_info.get('contentType', 'application/octet-stream')
-            })
+            urls.append(presign_upload(key, file_info))
         except Exception as e:
             print(f"Error generating presigned URL for {filename}: {e}")
             # Continue with other files
@@ -463,7 +1731,8 @@ def cors_response(status_code, body, headers=None):
         'Content-Type': 'application/json',
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Headers': 'Content-Type,X-Admin-Password',
-        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag'
     }
     if headers:
         response_headers.update(headers)
@@ -474,6 +1743,126 @@ def cors_response(status_code, body, headers=None):
         'body': json.dumps(body) if isinstance(body, (dict, list)) else body
     }
 
+def request_header(event, name):
+    """Header value from an API Gateway event; header names are case-insensitive."""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def response_etag(event, version):
+    """
+    Strong ETag for a response built from S3 data at version (source object
+    ETags) for this path and query. None when the version is unknown, e.g.
+    the source object is missing or too large to cache.
+    """
+    if version is None:
+        return None
+    path = event.get('path', event.get('rawPath', ''))
+    query = sorted((event.get('queryStringParameters') or {}).items())
+    digest = hashlib.sha1(json.dumps([path, version, query]).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+def matching_etag(event, etag):
+    """
+    If-None-Match check (weak comparison). An ETag with a per-encoding suffix
+    only matches when this request negotiates that same encoding; otherwise
+    the base ETag is compared. Returns the ETag of the representation the
+    client holds, suffix included, which is what a 304 must carry; None if
+    nothing matches.
+    """
+    header = request_header(event, 'If-None-Match')
+    if not header or not etag:
+        return None
+    if header.strip() == '*':
+        return etag
+    wanted = etag.strip('"')
+    negotiated = accepted_encoding(event) if COMPRESS_RESPONSES else None
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        held = candidate.strip('"')
+        candidate = held
+        for encoding in ('gzip', 'br'):
+            if candidate.endswith(f'-{encoding}'):
+                candidate = candidate[:-len(encoding) - 1] if encoding == negotiated else None
+                break
+        if candidate == wanted:
+            return f'"{held}"'
+    return None
+
+def etag_matches(event, etag):
+    return matching_etag(event, etag) is not None
+
+def cache_headers(route, etag=None):
+    headers = {'Cache-Control': RESPONSE_CACHE_CONTROL[route]}
+    if etag:
+        headers['ETag'] = etag
+    return headers
+
+def not_modified_response(event, route, etag):
+    return not_modified(event, cache_headers(route, etag))
+
+def not_modified(event, headers):
+    """304 carrying the representation ETag the client matched (and Vary, like the 200 had)."""
+    headers = dict(headers, ETag=matching_etag(event, headers['ETag']) or headers['ETag'])
+    if COMPRESS_RESPONSES:
+        headers['Vary'] = 'Accept-Encoding'
+    return cors_response(304, '', headers=headers)
+
+def accepted_encoding(event):
+    """Best response encoding the client accepts: br (when brotli is bundled), gzip, or None."""
+    header = request_header(event, 'Accept-Encoding') or ''
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+def finalize_response(event, response):
+    """
+    Conditional-GET and compression pass over a route's response.
+
+    Cacheable GET responses without a version-derived ETag get one from the
+    body hash, and a matching If-None-Match turns them into a 304. With
+    COMPRESS_RESPONSES, bodies of COMPRESS_MIN_BYTES or more are compressed
+    per Accept-Encoding and returned base64-encoded; the ETag gets an
+    encoding suffix so each representation keeps a distinct strong validator.
+    """
+    headers = response.setdefault('headers', {})
+    body = response.get('body') or ''
+    cacheable = 'Cache-Control' in headers
+    headers.setdefault('Cache-Control', 'no-store')
+
+    if response.get('statusCode') != 200 or not cacheable:
+        return response
+
+    if 'ETag' not in headers:
+        headers['ETag'] = '"%s"' % hashlib.sha1(body.encode('utf-8')).hexdigest()
+    if etag_matches(event, headers['ETag']):
+        return not_modified(event, {'Cache-Control': headers['Cache-Control'], 'ETag': headers['ETag']})
+
+    if not COMPRESS_RESPONSES:
+        return response
+    headers['Vary'] = 'Accept-Encoding'
+    encoding = accepted_encoding(event) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        raw = body.encode('utf-8')
+        compressed = brotli.compress(raw, quality=5) if encoding == 'br' else gzip.compress(raw, compresslevel=5)
+        response['body'] = base64.b64encode(compressed).decode('ascii')
+        response['isBase64Encoded'] = True
+        headers['Content-Encoding'] = encoding
+        headers['ETag'] = f'{headers["ETag"][:-1]}-{"br" if encoding == "br" else "gzip"}"'
+    return response
+
 def parse_path_params(path):
     """
     Parse category and id from path like /projects/{category}/{id}
@@ -507,12 +1896,68 @@ def parse_product_path(path):
 
     return params
 
+def warm_caches():
+    """
+    Load what cold read routes need: the S3 client, projects.json and the
+    catalog with its listing and search indexes. Returns per-step milliseconds.
+    """
+    timings = {}
+
+    def step(name, load):
+        started = time.perf_counter()
+        try:
+            load()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    step('s3Client', get_s3)
+    step('projects', get_projects_manifest)
+    step('catalog', get_catalog_data)
+    step('catalogIndex', lambda: get_catalog_index(get_catalog_data()))
+    step('searchIndex', lambda: get_search_index(get_catalog_data()))
+    print(f"Warm-up: {json.dumps(timings)}")
+    return timings
+
+def reset_clients():
+    """
+    After a snapshot restore: drop clients whose connections did not survive it,
+    and expire the cached JSON, which can be far older than CACHE_TTL_SECONDS,
+    so the first reads revalidate it by ETag.
+    """
+    global s3, lambda_client
+    s3 = None
+    lambda_client = None
+    expire_cached_json()
+
+_cold_start = True
+
+def request_summary(event):
+    """One log line per request instead of the whole event (bodies can be large)."""
+    method = event.get('httpMethod', event.get('requestContext', {}).get('http', {}).get('method', ''))
+    path = event.get('path', event.get('rawPath', ''))
+    body = event.get('body') or ''
+    query = event.get('queryStringParameters') or {}
+    return f"Request: {method} {path}" + (f" ?{'&'.join(sorted(query))}" if query else '') + (
+        f" ({len(body)} byte body)" if body else '')
+
 def handler(event, context):
     """
     Lambda handler for API Gateway events
     """
-    print(f"Event: {json.dumps(event)}")
-    
+    global _cold_start
+    if _cold_start:
+        _cold_start = False
+        print(f"Cold start: init took {INIT_MS} ms")
+    if event.get('action') == 'delete_prefixes':
+        return run_delete_job(event)
+    if event.get('action') == 'warmup':
+        return {'initMs': INIT_MS, 'warmup': warm_caches()}
+    print(request_summary(event))
+    return finalize_response(event, route_request(event, context))
+
+def route_request(event, context):
+    """Dispatch an API Gateway event to its route"""
     http_method = event.get('httpMethod', event.get('requestContext', {}).get('http', {}).get('method', ''))
     path = event.get('path', event.get('rawPath', ''))
     
@@ -533,34 +1978,37 @@ def handler(event, context):
         # Route: GET /projects
         if http_method == 'GET' and path == '/projects':
             manifest = get_projects_manifest()
-            return cors_response(200, manifest)
+            etag = response_etag(event, cached_etag(MANIFEST_KEY))
+            if etag_matches(event, etag):
+                return not_modified_response(event, 'projects', etag)
+            return cors_response(200, manifest, headers=cache_headers('projects', etag))
 
         # Route: GET /catalog
         if http_method == 'GET' and path == '/catalog':
             catalog = get_catalog_data()
+            # Listing, search and facets are all derived from this one catalog version
+            etag = response_etag(event, catalog_version())
+            if etag_matches(event, etag):
+                return not_modified_response(event, 'catalog', etag)
             payload = list_catalog_products(catalog, query_params)
-            return cors_response(200, payload)
+            return cors_response(200, payload, headers=cache_headers('catalog', etag))
 
         # Route: GET /catalog/{id-or-handle}
         if http_method == 'GET' and product_params.get('catalog_product'):
             catalog = get_catalog_data()
             identifier = product_params.get('catalog_product')
-            products = catalog.get('products', [])
-            idx = find_product_index(products, identifier)
+            idx = find_product_index(catalog, identifier)
             if idx < 0:
                 return cors_response(404, {'error': 'Product not found'})
 
-            product = products[idx]
-            related = [
-                p for p in products
-                if p.get('handle') != product.get('handle')
-                and (
-                    set(normalize_to_list(p.get('collections', []))) & set(normalize_to_list(product.get('collections', [])))
-                    or str(p.get('material', '')).strip().lower() == str(product.get('material', '')).strip().lower()
-                )
-            ][:8]
+            product = get_catalog_product(catalog, idx)
+            etag = response_etag(event, catalog_product_version(catalog['products'][idx]))
+            if etag_matches(event, etag):
+                return not_modified_response(event, 'catalog', etag)
+            related = get_related_products(catalog, product)
 
-            return cors_response(200, {'product': product, 'relatedProducts': related})
+            return cors_response(200, {'product': product, 'relatedProducts': related},
+                                 headers=cache_headers('catalog', etag))
         
         # Route: GET /projects/{category}/{id}
         if http_method == 'GET' and 'category' in path_params and 'id' in path_params:
@@ -569,19 +2017,32 @@ def handler(event, context):
                 project_id = path_params['id']
                 print(f"DEBUG: About to call get_project_metadata({category}, {project_id})")
                 metadata = get_project_metadata(category, project_id)
-                print(f"DEBUG: metadata result = {metadata}")
                 
                 if metadata is None:
                     print(f"DEBUG: Metadata is None, returning 404")
                     return cors_response(404, {'error': 'Project not found'})
             except Exception as e:
                 print(f"ERROR in GET metadata route: {str(e)}")
-                import traceback
                 traceback.print_exc()
                 return cors_response(500, {'error': str(e)})
             
-            return cors_response(200, metadata)
+            # Read straight from S3, so the ETag comes from the body (finalize_response)
+            return cors_response(200, metadata, headers=cache_headers('project'))
         
+        # Route: POST /projects/summaries (one-off backfill of listing fields)
+        if http_method == 'POST' and path == '/projects/summaries':
+            if not verify_admin(event):
+                return cors_response(401, {'error': 'Unauthorized'})
+            return cors_response(200, {'message': 'Project summaries updated', 'filled': backfill_project_summaries()})
+
+        # Route: POST /projects/batch
+        if http_method == 'POST' and path == '/projects/batch':
+            body = json.loads(event.get('body') or '{}')
+            refs, error = parse_project_refs(body.get('projects') if isinstance(body, dict) else None)
+            if error:
+                return cors_response(400, {'error': error})
+            return cors_response(200, {'projects': get_project_metadata_batch(refs)})
+
         # Route: POST /projects (Create new project)
         if http_method == 'POST' and path == '/projects':
             if not verify_admin(event):
@@ -619,6 +2080,11 @@ def handler(event, context):
             
             category = body['category']
             
+            duplicate_error = {
+                'error': f'Project with ID "{project_id}" already exists in category "{category}"',
+                'suggestion': 'Please use a different title or provide a unique ID'
+            }
+
             # Check for duplicates
             manifest = get_projects_manifest()
             existing_project = next(
@@ -627,10 +2093,7 @@ def handler(event, context):
             )
             
             if existing_project:
-                return cors_response(409, {
-                    'error': f'Project with ID "{project_id}" already exists in category "{category}"',
-                    'suggestion': 'Please use a different title or provide a unique ID'
-                })
+                return cors_response(409, duplicate_error)
             
             # Create project metadata
             metadata = {
@@ -644,32 +2107,50 @@ def handler(event, context):
                 'media': []
             }
             
-            # Save metadata
+            # Save metadata; create-only, since the cached manifest above can miss a project
+            # another container has just created
             try:
-                save_project_metadata(category, project_id, metadata)
+                save_project_metadata(category, project_id, metadata, create_only=True)
+            except ClientError as e:
+                if is_write_conflict(e):
+                    return cors_response(409, duplicate_error)
+                print(f"Error saving metadata: {e}")
+                return cors_response(500, {'error': f'Failed to save project metadata: {str(e)}'})
             except Exception as e:
                 print(f"Error saving metadata: {e}")
                 return cors_response(500, {'error': f'Failed to save project metadata: {str(e)}'})
             
-            # Update manifest
-            try:
-                manifest['projects'].append({
-                    'id': project_id,
-                    'category': category,
-                    'path': f"projects/{category}/{project_id}/"
-                })
-                save_projects_manifest(manifest)
-            except Exception as e:
-                print(f"Error updating manifest: {e}")
-                # Try to rollback metadata creation
+            def rollback_metadata():
                 try:
-                    s3.delete_object(
+                    get_s3().delete_object(
                         Bucket=BUCKET_NAME,
                         Key=f"projects/{category}/{project_id}/metadata.json"
                     )
+                    invalidate_cached_json(f"projects/{category}/{project_id}/metadata.json")
                 except:
                     pass
+
+            # Update manifest (re-checked for duplicates against the version being written;
+            # declining leaves it untouched and update_projects_manifest returns None)
+            def add_project(manifest):
+                if any(p['id'] == project_id and p['category'] == category for p in manifest['projects']):
+                    return None
+                return dict(manifest, projects=manifest['projects'] + [{
+                    'id': project_id,
+                    'category': category,
+                    'path': f"projects/{category}/{project_id}/",
+                    **project_summary(metadata)
+                }])
+
+            try:
+                added = update_projects_manifest(add_project)
+            except Exception as e:
+                print(f"Error updating manifest: {e}")
+                rollback_metadata()
                 return cors_response(500, {'error': f'Failed to update projects manifest: {str(e)}'})
+            if added is None:
+                rollback_metadata()
+                return cors_response(409, duplicate_error)
             
             # Generate upload URLs if files provided
             upload_urls = []
@@ -697,25 +2178,10 @@ def handler(event, context):
             if not str(body.get('title', '')).strip():
                 return cors_response(400, {'error': 'Missing required field: title'})
 
-            catalog = get_catalog_data()
-            products = catalog.get('products', [])
-
             new_product = normalize_product_payload(body)
-            duplicate = next(
-                (
-                    p for p in products
-                    if str(p.get('product_id')) == str(new_product.get('product_id'))
-                    or str(p.get('handle')) == str(new_product.get('handle'))
-                ),
-                None
-            )
-            if duplicate:
+            if not insert_catalog_product(new_product):
                 return cors_response(409, {'error': 'Product with same id or handle already exists'})
 
-            products.append(new_product)
-            catalog['products'] = products
-            save_catalog_data(catalog)
-
             upload_urls = []
             if body.get('files'):
                 upload_urls = generate_product_upload_urls(new_product.get('handle'), body.get('files'))
@@ -734,21 +2200,32 @@ def handler(event, context):
             category = path_params['category']
             project_id = path_params['id']
             
-            # Get existing metadata
-            metadata = get_project_metadata(category, project_id)
+            body = json.loads(event.get('body', '{}'))
+
+            # Update existing metadata with new data; re-applied if the upload processor writes concurrently
+            def apply_changes(metadata):
+                if metadata is None:
+                    return None
+                metadata = dict(metadata)
+                if 'cover' in body and body['cover'] != metadata.get('cover'):
+                    # Poster and preview belong to the previous cover video
+                    metadata.pop('coverPoster', None)
+                    metadata.pop('coverPreview', None)
+                for key in ['title', 'area', 'description', 'cover', 'media']:
+                    if key in body:
+                        metadata[key] = body[key]
+                metadata['updatedAt'] = datetime.utcnow().isoformat() + 'Z'
+                return metadata
+
+            metadata = update_project_metadata(category, project_id, apply_changes)
             if metadata is None:
                 return cors_response(404, {'error': 'Project not found'})
-            
-            # Update with new data
-            body = json.loads(event.get('body', '{}'))
-            for key in ['title', 'area', 'description', 'cover', 'media']:
-                if key in body:
-                    metadata[key] = body[key]
-            
-            metadata['updatedAt'] = datetime.utcnow().isoformat() + 'Z'
-            
-            # Save updated metadata
-            save_project_metadata(category, project_id, metadata)
+
+            try:
+                sync_project_summary(category, project_id, metadata)
+            except Exception as e:
+                # metadata.json is the source of truth; the listing catches up on the next write
+                print(f"Error updating projects manifest summary: {e}")
             
             # Generate upload URLs if needed
             upload_urls = []
@@ -769,18 +2246,13 @@ def handler(event, context):
             identifier = product_params.get('product')
             body = json.loads(event.get('body', '{}'))
 
-            catalog = get_catalog_data()
-            products = catalog.get('products', [])
-            idx = find_product_index(products, identifier)
-            if idx < 0:
+            updated = replace_catalog_product(
+                identifier,
+                lambda current: normalize_product_payload(body, current)
+            )
+            if updated is None:
                 return cors_response(404, {'error': 'Product not found'})
 
-            current = products[idx]
-            updated = normalize_product_payload(body, current)
-            products[idx] = updated
-            catalog['products'] = products
-            save_catalog_data(catalog)
-
             upload_urls = []
             if body.get('files'):
                 upload_urls = generate_product_upload_urls(updated.get('handle'), body.get('files'))
@@ -799,58 +2271,88 @@ def handler(event, context):
             category = path_params['category']
             project_id = path_params['id']
             
+            prefixes = [f"projects/{category}/{project_id}/", f"uploads/{category}/{project_id}/"]
+            remove_from_manifest = lambda manifest: dict(manifest, projects=[
+                p for p in manifest['projects']
+                if not (p['category'] == category and p['id'] == project_id)
+            ])
+
             try:
-                # Delete project folder
-                prefix = f"projects/{category}/{project_id}/"
-                print(f"DEBUG: Deleting S3 folder with prefix: {prefix}")
-                delete_s3_folder(prefix)
-                
-                # Also delete uploads folder if exists
-                uploads_prefix = f"uploads/{category}/{project_id}/"
-                print(f"DEBUG: Deleting uploads folder with prefix: {uploads_prefix}")
-                delete_s3_folder(uploads_prefix)
-                
-                # Update manifest
-                print("DEBUG: Updating manifest...")
-                manifest = get_projects_manifest()
-                manifest['projects'] = [
-                    p for p in manifest['projects'] 
-                    if not (p['category'] == category and p['id'] == project_id)
-                ]
-                save_projects_manifest(manifest)
-                print("DEBUG: Delete completed successfully")
-                
-                return cors_response(200, {'message': 'Project deleted'})
+                async_mode = (query_params.get('async') or '').strip().lower()
+                run_async = can_run_jobs() and (
+                    async_mode in ('1', 'true')
+                    or (async_mode not in ('0', 'false') and prefixes_exceed(prefixes, DELETE_ASYNC_THRESHOLD))
+                )
+                job = start_delete_job(prefixes) if run_async else None
+                if job is not None:
+                    # The project leaves the listing now; its objects go in the background
+                    update_projects_manifest(remove_from_manifest)
+                    return cors_response(202, {
+                        'message': 'Project deletion started',
+                        'jobId': job['jobId'],
+                        'statusUrl': f"/jobs/{job['jobId']}"
+                    })
+
+                result = delete_s3_prefixes(prefixes)
+                if result['errors']:
+                    # Keep the manifest entry so the delete can be retried
+                    return cors_response(500, {
+                        'error': f"Failed to delete {len(result['errors'])} objects",
+                        'deleted': result['deleted'],
+                        'failedKeys': result['errors'][:MAX_REPORTED_ERRORS]
+                    })
+
+                update_projects_manifest(remove_from_manifest)
+                print(f"Deleted project {category}/{project_id}: {result['deleted']} objects")
+
+                return cors_response(200, {'message': 'Project deleted', 'deleted': result['deleted']})
             except Exception as e:
                 print(f"ERROR deleting project: {str(e)}")
-                import traceback
                 traceback.print_exc()
                 return cors_response(500, {'error': f'Failed to delete project: {str(e)}'})
 
+        # Route: GET /jobs/{id}
+        if http_method == 'GET' and path.startswith('/jobs/'):
+            if not verify_admin(event):
+                return cors_response(401, {'error': 'Unauthorized'})
+            job_id = path[len('/jobs/'):].strip('/')
+            if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+                return cors_response(404, {'error': 'Job not found'})
+            try:
+                # Written by another invocation; always check the ETag
+                job = get_cached_json_entry(job_key(job_id), revalidate=True)[0]
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'NoSuchKey':
+                    return cors_response(404, {'error': 'Job not found'})
+                raise
+            return cors_response(200, job)
+
         # Route: DELETE /products/{id-or-handle}
         if http_method == 'DELETE' and product_params.get('product'):
             if not verify_admin(event):
                 return cors_response(401, {'error': 'Unauthorized'})
 
             identifier = product_params.get('product')
-            catalog = get_catalog_data()
-            products = catalog.get('products', [])
-            idx = find_product_index(products, identifier)
-            if idx < 0:
+            product = remove_catalog_product(identifier)
+            if product is None:
                 return cors_response(404, {'error': 'Product not found'})
 
-            product = products[idx]
             product_handle = product.get('handle') or str(product.get('product_id'))
 
-            del products[idx]
-            catalog['products'] = products
-            save_catalog_data(catalog)
-
             # Best-effort cleanup for uploaded product media
             delete_s3_folder(f"uploads/products/{product_handle}/")
 
             return cors_response(200, {'message': 'Product deleted'})
         
+        # Route: POST /uploads/multipart/{create,parts,complete,abort}
+        if http_method == 'POST' and path.startswith('/uploads/multipart/'):
+            if not verify_admin(event):
+                return cors_response(401, {'error': 'Unauthorized'})
+            action = path[len('/uploads/multipart/'):].strip('/')
+            if action not in ('create', 'parts', 'complete', 'abort'):
+                return cors_response(404, {'error': 'Not found'})
+            return handle_multipart_request(action, json.loads(event.get('body') or '{}'))
+
         # Route: POST /projects/{category}/{id}/upload-urls (Get upload URLs)
         if http_method == 'POST' and path.endswith('/upload-urls'):
             if path.startswith('/products/'):
@@ -882,4 +2384,13 @@ def handler(event, context):
     
     except Exception as e:
         print(f"Error: {e}")
+        traceback.print_exc()
         return cors_response(500, {'error': str(e)})
+
+if os.environ.get('PREWARM_ON_INIT', 'false').strip().lower() == 'true':
+    warm_caches()
+if register_before_snapshot is not None:
+    register_before_snapshot(warm_caches)
+    register_after_restore(reset_clients)
+
+INIT_MS = round((time.perf_counter() - INIT_STARTED) * 1000, 1)
@@ -3,43 +3,173 @@ AWS Lambda Function: Process Media Uploads
 
 Triggered by S3 PUT events on the uploads/ prefix.
 Converts:
-- Images (jpg, jpeg, png, bmp, gif) -> WebP
-- Videos (mp4, mov, avi) -> HLS (240p, 480p)
+- Images (jpg, jpeg, png, bmp, gif) -> WebP variant ladder (see IMAGE_VARIANTS)
+- Videos (mp4, mov, avi) -> HLS (240p, 480p), a WebP poster frame and a short muted MP4 preview loop
 
 After processing, moves files to projects/{category}/{id}/ folder.
 
 Requires Lambda Layer with:
 - Pillow (PIL)
 - FFmpeg binary
+- boto3/botocore 1.35.69 or newer, if the runtime's is older (metadata and catalog writes
+  use PutObject IfMatch / IfNoneMatch)
 
 Environment Variables:
 - BUCKET_NAME: S3 bucket name
 - OUTPUT_PREFIX: Output folder prefix (default: "projects")
+- CATALOG_STORAGE: "single" (default) or "sharded"; must match the API Lambda
+- IMAGE_VARIANTS: Comma-separated name:max_width WebP ladder. The "full" variant keeps the
+  original {name}.webp key; the others are written as {name}-{variant}.webp
+  (default: "thumbnail:320,card:640,detail:1280,full:2560")
+- IMAGE_MEMORY_MAX_BYTES: Images up to this size are read, converted and written back
+  entirely in memory; larger ones are staged in /tmp (default: 26214400, 25 MB)
+- HLS_SEGMENT_FORMAT: "ts" writes one MPEG-TS object per segment (default); "fmp4" writes
+  each rendition as a single fragmented MP4 (CMAF) addressed by byte ranges, so a rendition
+  is two S3 objects (stream.mp4 + playlist.m3u8) instead of one per 4 seconds
+- HLS_CHUNK_SECONDS: With HLS_CHUNK_WORKERS set, videos longer than HLS_CHUNK_THRESHOLD_SECONDS
+  are cut into chunks of this many seconds (rounded to whole segments), encoded in parallel
+  and stitched into one playlist per rendition; 0 disables chunking (default: 60)
+- HLS_CHUNK_THRESHOLD_SECONDS: Minimum source duration for chunked encoding (default: 300)
+- HLS_CHUNK_WORKERS: Enables chunked encoding (default: off). "lambda" encodes each chunk in
+  a separate invocation of this function (needs lambda:InvokeFunction on itself and spare
+  concurrency); "local" runs the chunk encodes as concurrent FFmpeg processes in this
+  invocation, which shares its vCPUs, so the deadline budget gets no parallelism credit.
+  If a chunked encode fails, the video is encoded in a single pass instead
+- HLS_CHUNK_CONCURRENCY: Chunks encoded at once (default: 10)
+- HLS_PUBLISH_MODE: "complete" publishes a video once every rendition is encoded (default);
+  "progressive" encodes and publishes the smallest rendition first, updates the project
+  metadata/catalog entry so the video is playable, then adds the higher renditions and
+  re-publishes master.m3u8 (served with Cache-Control: no-cache in this mode)
+- HLS_ENCODE_SPEED: Seconds of 480p-equivalent video the function encodes per second; with
+  the ffprobe duration this predicts encode time, and renditions are dropped (largest
+  first) when the prediction would overrun the remaining invocation time (default: 3.0)
+- VIDEO_PREVIEW_SECONDS: Length of the muted preview loop written next to each HLS master;
+  0 disables previews (default: 6)
+- VIDEO_INPUT_MODE: "url" lets FFmpeg read the upload through a presigned GET URL so the
+  download overlaps decoding and the source never lands in /tmp (default); "download"
+  stages the whole file in /tmp first. URL mode falls back to a download if FFmpeg fails.
+- HLS_ENCODE_MODE: "split" decodes the source once and encodes every rendition in one
+  FFmpeg run (default); "parallel" runs one FFmpeg process per rendition concurrently;
+  "sequential" runs them one after another
+- UPLOAD_CONCURRENCY: Parallel S3 uploads for HLS output, also the connection pool size (default: 16)
+- S3_MAX_ATTEMPTS: botocore retry attempts per S3 call (default: 5)
+- RECORD_CONCURRENCY: Uploads converted in parallel within one batch of records (default: 4)
+- WRITE_MAX_ATTEMPTS: Attempts for an optimistic (If-Match) JSON write before giving up (default: 5)
 """
 
+import io
 import json
 import os
+import random
+import shutil
+import time
 import boto3
 import subprocess
+from botocore.config import Config
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import unquote_plus
 from botocore.exceptions import ClientError
 
+UPLOAD_CONCURRENCY = max(1, int(os.environ.get('UPLOAD_CONCURRENCY', '16')))
+S3_MAX_ATTEMPTS = int(os.environ.get('S3_MAX_ATTEMPTS', '5'))
+
 # Initialize S3 client with explicit region
 # Force regional endpoint
-s3 = boto3.client('s3', region_name='me-central-1')
+# Connection pool sized for concurrent segment uploads; standard mode retries throttling/5xx.
+s3 = boto3.client('s3', config=Config(
+    region_name='me-central-1',
+    max_pool_connections=UPLOAD_CONCURRENCY,
+    retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'}
+))
+
+# Created on first chunk fan-out; most invocations never need it
+lambda_client = None
+
+def get_lambda_client():
+    global lambda_client
+    if lambda_client is None:
+        lambda_client = boto3.client('lambda', config=Config(
+            region_name='me-central-1',
+            read_timeout=LAMBDA_INVOKE_TIMEOUT_SECONDS,
+            max_pool_connections=HLS_CHUNK_CONCURRENCY,
+            # A failed chunk fails the video; never re-run a chunk behind our back
+            retries={'max_attempts': 0}
+        ))
+    return lambda_client
 
 # Supported formats
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif'}
 VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv'}
 
+def parse_image_variants(spec):
+    """Parse IMAGE_VARIANTS into [(name, max_width)], largest first."""
+    variants = []
+    for entry in spec.split(','):
+        name, _, width = entry.strip().partition(':')
+        if name and width.strip().isdigit() and int(width) > 0:
+            variants.append((name.strip(), int(width)))
+    if not any(name == 'full' for name, _ in variants):
+        variants.append(('full', max([width for _, width in variants] or [2560])))
+    return sorted(variants, key=lambda variant: variant[1], reverse=True)
+
+IMAGE_VARIANTS = parse_image_variants(
+    os.environ.get('IMAGE_VARIANTS', 'thumbnail:320,card:640,detail:1280,full:2560')
+)
+WEBP_QUALITY = 85
+IMAGE_MEMORY_MAX_BYTES = int(os.environ.get('IMAGE_MEMORY_MAX_BYTES', str(25 * 1024 * 1024)))
+
 # HLS renditions for Lambda (limited to 240p and 480p due to timeout constraints)
+# bandwidth is the nominal peak, used as the VBV cap; the master playlist advertises measured rates.
 HLS_RENDITIONS = {
-    "480": {"width": 854, "height": 480, "bandwidth": 1500000},
-    "240": {"width": 426, "height": 240, "bandwidth": 500000},
+    "480": {"width": 854, "height": 480, "bandwidth": 1500000, "crf": 23},
+    "240": {"width": 426, "height": 240, "bandwidth": 500000, "crf": 22},
 }
+HLS_SEGMENT_SECONDS = 4
+HLS_SEGMENT_FORMAT = os.environ.get('HLS_SEGMENT_FORMAT', 'ts').strip().lower()
+HLS_MAX_FPS = 30
+FFMPEG_PATH = "/opt/bin/ffmpeg"  # FFmpeg from Lambda layer
+FFPROBE_PATH = "/opt/bin/ffprobe"
+FFMPEG_TIMEOUT_SECONDS = 600
+FFPROBE_TIMEOUT_SECONDS = 60
+# Seconds of 480p-equivalent video encoded per wall-clock second, for budget planning
+HLS_ENCODE_SPEED = float(os.environ.get('HLS_ENCODE_SPEED', '3.0'))
+# Kept free after encoding for uploads and metadata writes
+HLS_BUDGET_RESERVE_SECONDS = 30
+HLS_ENCODE_MODE = os.environ.get('HLS_ENCODE_MODE', 'split').strip().lower()
+HLS_CHUNK_SECONDS = int(os.environ.get('HLS_CHUNK_SECONDS', '60'))
+HLS_CHUNK_THRESHOLD_SECONDS = float(os.environ.get('HLS_CHUNK_THRESHOLD_SECONDS', '300'))
+HLS_CHUNK_WORKERS = os.environ.get('HLS_CHUNK_WORKERS', 'off').strip().lower()
+HLS_CHUNK_CONCURRENCY = max(1, int(os.environ.get('HLS_CHUNK_CONCURRENCY', '10')))
+# A chunk worker invocation can run up to the 15 minute Lambda maximum
+LAMBDA_INVOKE_TIMEOUT_SECONDS = 900
+HLS_PUBLISH_MODE = os.environ.get('HLS_PUBLISH_MODE', 'complete').strip().lower()
+VIDEO_PREVIEW_SECONDS = float(os.environ.get('VIDEO_PREVIEW_SECONDS', '6'))
+VIDEO_PREVIEW_HEIGHT = 360
+# Poster candidates are compared at this width at most, bounding thumbnail filter memory
+VIDEO_POSTER_MAX_WIDTH = 1280
+VIDEO_POSTER_CANDIDATE_FRAMES = 50
+VIDEO_INPUT_MODE = os.environ.get('VIDEO_INPUT_MODE', 'url').strip().lower()
+# Long enough to cover the split encode plus the per-rendition fallback
+VIDEO_INPUT_URL_EXPIRES = 3 * FFMPEG_TIMEOUT_SECONDS
 CATALOG_KEY = 'catalog/products.json'
+CATALOG_STORAGE = os.environ.get('CATALOG_STORAGE', 'single').strip().lower()
+CATALOG_INDEX_KEY = 'catalog/index.json'
+CATALOG_ITEMS_PREFIX = 'catalog/items/'
+# Must match LISTING_FIELDS in the API Lambda
+LISTING_FIELDS = (
+    'product_id', 'handle', 'title', 'product_number', 'price', 'compare_at_price',
+    'price_currency', 'available', 'primary_image', 'usage_image_url', 'usage_image_original',
+    'collections', 'material', 'selling_type', 'created_at', 'updated_at',
+)
+LISTING_GALLERY_IMAGES = 2
+PROJECTS_MANIFEST_KEY = 'projects.json'
+# Must match PROJECT_SUMMARY_FIELDS in the API Lambda
+PROJECT_SUMMARY_FIELDS = ('title', 'area', 'description', 'cover', 'coverPoster', 'coverPreview')
+WRITE_MAX_ATTEMPTS = int(os.environ.get('WRITE_MAX_ATTEMPTS', '5'))
+RECORD_CONCURRENCY = max(1, int(os.environ.get('RECORD_CONCURRENCY', '4')))
+WRITE_RETRY_BASE_SECONDS = 0.05
 
 def is_image(filename):
     """Check if file is an image"""
@@ -51,84 +181,444 @@ def is_video(filename):
     _, ext = os.path.splitext(filename.lower())
     return ext in VIDEO_EXTENSIONS
 
-def convert_image_to_webp(input_path, output_path):
-    """Convert image to WebP format using Pillow"""
+def variant_filename(base_name, variant_name):
+    """The full variant keeps the historical {name}.webp key so existing URLs stay valid."""
+    if variant_name == 'full':
+        return f"{base_name}.webp"
+    return f"{base_name}-{variant_name}.webp"
+
+def convert_image_to_webp(source, base_name):
+    """
+    Convert an image to the IMAGE_VARIANTS WebP ladder using Pillow.
+    JPEGs are decoded with draft() at the smallest DCT scale that still covers
+    the largest variant, and each smaller variant is resized from the previous
+    one (reduce() first, then Lambda filtering) instead of from the original.
+    Variants are never upscaled; sizes the source cannot fill are skipped.
+    source is a file path or a file-like object; output is encoded in memory.
+    Returns [{'name', 'filename', 'body', 'width', 'height'}] largest first, or [] on failure.
+    """
     try:
         from PIL import Image
-        with Image.open(input_path) as img:
+        with Image.open(source) as img:
+            source_width, source_height = img.size
+            largest = min(IMAGE_VARIANTS[0][1], source_width)
+            # No-op for non-JPEG sources
+            img.draft('RGB', (largest, max(1, round(source_height * largest / source_width))))
+
             # Convert to RGB if necessary (for PNG with transparency)
             if img.mode in ('RGBA', 'LA', 'P'):
                 background = Image.new('RGB', img.size, (255, 255, 255))
                 if img.mode == 'P':
                     img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
                 img = background
-            img.save(output_path, 'WEBP', quality=85)
-        return True
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            outputs = []
+            current = img
+            for name, max_width in IMAGE_VARIANTS:
+                width = min(max_width, source_width)
+                if name != 'full' and outputs and width >= outputs[-1]['width']:
+                    # Source too small to need this size; a larger variant already covers it
+                    continue
+                height = max(1, round(source_height * width / source_width))
+                if current.size != (width, height):
+                    current = current.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+                buffer = io.BytesIO()
+                current.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+                outputs.append({
+                    'name': name,
+                    'filename': variant_filename(base_name, name),
+                    'body': buffer.getvalue(),
+                    'width': width,
+                    'height': height,
+                })
+        return outputs
     except Exception as e:
         print(f"Error converting image: {e}")
+        return []
+
+def rendition_filter(params):
+    """Scale into the rendition box keeping aspect ratio, then pad to its exact size."""
+    width = params["width"]
+    height = params["height"]
+    video_filter = f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    if params.get("fps"):
+        video_filter += f",fps={params['fps']}"
+    return video_filter
+
+def chunk_prefix(chunk):
+    """File name prefix keeping one chunk's segments and playlist apart from the others'."""
+    return f"c{chunk['index']:03d}_" if chunk else ""
+
+def rendition_output_args(res, params, output_dir, chunk=None):
+    """Encoder and HLS muxer options for one rendition output."""
+    variant_dir = os.path.join(output_dir, res)
+    os.makedirs(variant_dir, exist_ok=True)
+    prefix = chunk_prefix(chunk)
+    args = [
+        "-c:v", "libx264",
+        "-crf", str(params.get("crf", 23)),
+        "-preset", "veryfast",
+        # Capped CRF: quality-driven, but peaks stay within the rendition's nominal bandwidth
+        "-maxrate", str(params["bandwidth"]),
+        "-bufsize", str(params["bandwidth"] * 2),
+    ]
+    if params.get("gop"):
+        # Keyframe at every segment boundary
+        args += ["-g", str(params["gop"]), "-keyint_min", str(params["gop"]), "-sc_threshold", "0"]
+    if params.get("audio", True):
+        args += ["-c:a", "aac", "-b:a", "128k", "-ac", "2"]
+    else:
+        args += ["-an"]
+    if chunk:
+        # Keep the stitched rendition on one continuous timeline
+        args += ["-output_ts_offset", str(chunk['start'])]
+    args += [
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+    ]
+    if HLS_SEGMENT_FORMAT == 'fmp4':
+        # One CMAF file per rendition: init segment and fragments addressed with EXT-X-BYTERANGE
+        args += [
+            "-hls_segment_type", "fmp4",
+            "-hls_flags", "single_file",
+            "-hls_segment_filename", os.path.join(variant_dir, f"{prefix}stream.mp4"),
+        ]
+    else:
+        args += ["-hls_segment_filename", os.path.join(variant_dir, f"{prefix}segment%03d.ts")]
+    return args + [os.path.join(variant_dir, f"{prefix}playlist.m3u8")]
+
+def ffmpeg_input_args(input_path, chunk=None):
+    """
+    -i for a local file or, for a presigned URL, HTTP input that reconnects on dropped reads.
+    A chunk seeks the input to its start (frame-accurate when transcoding) and reads its duration.
+    """
+    args = []
+    if chunk:
+        args += ["-ss", str(chunk['start']), "-t", str(chunk['duration'])]
+    if input_path.startswith(('http://', 'https://')):
+        args += ["-reconnect", "1", "-reconnect_delay_max", "5"]
+    return args + ["-i", input_path]
+
+def build_split_command(input_path, renditions, output_dir, chunk=None):
+    """
+    One FFmpeg run that decodes the source once and feeds every rendition
+    through a split filter graph, writing one HLS variant per output.
+    """
+    labels = [f"s{i}" for i in range(len(renditions))]
+    graph = [f"[0:v]split={len(renditions)}" + "".join(f"[{label}]" for label in labels)]
+    for i, (res, params) in enumerate(renditions):
+        graph.append(f"[{labels[i]}]{rendition_filter(params)}[v{i}]")
+
+    command = [FFMPEG_PATH, "-y"] + ffmpeg_input_args(input_path, chunk) + ["-filter_complex", ";".join(graph)]
+    for i, (res, params) in enumerate(renditions):
+        command += ["-map", f"[v{i}]"]
+        if params.get("audio", True):
+            command += ["-map", "0:a:0?"]
+        command += rendition_output_args(res, params, output_dir, chunk)
+    return command
+
+def build_rendition_command(input_path, res, params, output_dir, threads=None, chunk=None):
+    command = [FFMPEG_PATH, "-y"] + ffmpeg_input_args(input_path, chunk) + ["-vf", rendition_filter(params)]
+    if threads:
+        command += ["-threads", str(threads)]
+    return command + rendition_output_args(res, params, output_dir, chunk)
+
+def run_ffmpeg(command, label, timeout=FFMPEG_TIMEOUT_SECONDS):
+    """Run an FFmpeg command; returns True on success."""
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            print(f"FFmpeg error for {label}: {result.stderr}")
+            return False
+        return True
+    except subprocess.TimeoutExpired:
+        print(f"FFmpeg timeout for {label} - video may be too long")
+        return False
+    except Exception as e:
+        print(f"Error generating HLS {label}: {e}")
         return False
 
-def generate_hls(input_path, output_dir):
+def parse_frame_rate(value):
+    """ffprobe rates look like "30000/1001"; returns frames per second or None."""
+    try:
+        num, _, den = str(value).partition('/')
+        rate = float(num) / float(den or 1)
+        return rate if rate > 0 else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def probe_video(input_path):
     """
-    Generate HLS streams for video.
-    Returns path to master.m3u8
+    ffprobe the source for display size, frame rate, duration and audio presence.
+    Returns None if probing fails; callers then fall back to the fixed ladder.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
-    master_playlist_lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
-    
+    command = [FFPROBE_PATH, "-v", "error", "-print_format", "json", "-show_format", "-show_streams"]
+    if input_path.startswith(('http://', 'https://')):
+        command += ["-reconnect", "1"]
+    try:
+        result = subprocess.run(command + [input_path], capture_output=True, text=True, timeout=FFPROBE_TIMEOUT_SECONDS)
+        if result.returncode != 0:
+            print(f"FFprobe error: {result.stderr}")
+            return None
+        info = json.loads(result.stdout)
+    except Exception as e:
+        print(f"Error probing video: {e}")
+        return None
+
+    streams = info.get('streams', [])
+    video = next((stream for stream in streams if stream.get('codec_type') == 'video'), None)
+    if not video or not video.get('width') or not video.get('height'):
+        print("FFprobe found no video stream")
+        return None
+
+    width, height = int(video['width']), int(video['height'])
+    rotation = video.get('tags', {}).get('rotate')
+    for side_data in video.get('side_data_list', []):
+        rotation = side_data.get('rotation', rotation)
+    try:
+        if abs(int(float(rotation or 0))) % 180 == 90:
+            # Phone footage: stored landscape, displayed portrait
+            width, height = height, width
+    except ValueError:
+        pass
+
+    try:
+        duration = float(info.get('format', {}).get('duration') or video.get('duration') or 0)
+    except ValueError:
+        duration = 0.0
+
+    return {
+        'width': width,
+        'height': height,
+        'fps': parse_frame_rate(video.get('avg_frame_rate')) or parse_frame_rate(video.get('r_frame_rate')),
+        'duration': duration,
+        'has_audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+    }
+
+def even(value):
+    """libx264 needs even dimensions."""
+    return max(2, int(round(value / 2.0)) * 2)
+
+def predicted_encode_seconds(renditions, duration):
+    """Encode time estimate: source duration scaled by output pixel rate relative to 480p."""
+    reference = HLS_RENDITIONS["480"]["width"] * HLS_RENDITIONS["480"]["height"]
+    pixels = sum(params["width"] * params["height"] * (params.get("fps") or 30) / 30.0 for _, params in renditions)
+    return duration * (pixels / reference) / HLS_ENCODE_SPEED
+
+def plan_renditions(probe, deadline=None, parallelism=1):
+    """
+    Choose the rendition ladder for a source. Never upscales: renditions taller
+    than the source are dropped, and a source smaller than every rendition gets
+    a single one at its own size. Renditions follow the source aspect ratio, so
+    nothing is padded. Frame rate is capped at HLS_MAX_FPS with a keyframe at
+    every segment boundary; silent sources skip audio encoding. With a deadline
+    (time.monotonic() seconds) the largest renditions are dropped until the
+    predicted encode, spread over parallelism chunk workers, fits.
+    """
+    if not probe:
+        return list(HLS_RENDITIONS.items())
+
+    aspect = probe['width'] / float(probe['height'])
+    fps = min(probe['fps'] or HLS_MAX_FPS, HLS_MAX_FPS)
+    renditions = []
     for res, params in HLS_RENDITIONS.items():
-        width = params["width"]
-        height = params["height"]
-        bandwidth = params["bandwidth"]
-        
-        variant_dir = os.path.join(output_dir, res)
-        os.makedirs(variant_dir, exist_ok=True)
-        
-        playlist_path = os.path.join(variant_dir, "playlist.m3u8")
-        
-        # FFmpeg command for HLS conversion
-        command = [
-            "/opt/bin/ffmpeg",  # FFmpeg from Lambda layer
-            "-y",
-            "-i", input_path,
-            "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
-            "-c:v", "libx264",
-            "-crf", "23",
-            "-preset", "veryfast",
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-ac", "2",
-            "-f", "hls",
-            "-hls_time", "4",
-            "-hls_playlist_type", "vod",
-            "-hls_segment_filename", os.path.join(variant_dir, "segment%03d.ts"),
-            playlist_path
-        ]
-        
-        try:
-            result = subprocess.run(command, capture_output=True, text=True, timeout=600)
-            if result.returncode != 0:
-                print(f"FFmpeg error for {res}: {result.stderr}")
-                continue
-            print(f"Generated HLS {res}p stream")
-        except subprocess.TimeoutExpired:
-            print(f"FFmpeg timeout for {res}p - video may be too long")
-            continue
-        except Exception as e:
-            print(f"Error generating HLS {res}: {e}")
+        if params["height"] > probe['height']:
             continue
-        
-        master_playlist_lines.append(
-            f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}'
+        renditions.append((res, dict(params, width=even(params["height"] * aspect))))
+    if not renditions:
+        smallest_res, smallest = min(HLS_RENDITIONS.items(), key=lambda item: item[1]["height"])
+        height = even(probe['height'])
+        renditions.append((str(height), dict(
+            smallest, width=even(probe['width']), height=height,
+            bandwidth=max(100000, int(smallest["bandwidth"] * height / smallest["height"]))
+        )))
+
+    for _, params in renditions:
+        params.update(
+            audio=probe['has_audio'],
+            fps=round(fps, 3) if probe['fps'] and probe['fps'] > HLS_MAX_FPS else None,
+            gop=max(1, int(round(fps * HLS_SEGMENT_SECONDS))),
         )
+
+    if deadline is not None and probe['duration']:
+        budget = deadline - time.monotonic() - HLS_BUDGET_RESERVE_SECONDS
+        duration = probe['duration'] / parallelism
+        while len(renditions) > 1 and predicted_encode_seconds(renditions, duration) > budget:
+            dropped = max(renditions, key=lambda item: item[1]["height"])
+            renditions.remove(dropped)
+            print(f"Dropping {dropped[0]}p rendition to fit the remaining {budget:.0f}s budget")
+        if predicted_encode_seconds(renditions, duration) > budget:
+            print(f"WARNING: {renditions[0][0]}p encode predicted to exceed the remaining {budget:.0f}s budget")
+
+    return renditions
+
+def measured_bandwidth(playlist_path):
+    """Peak and average bits per second over the segments of a VOD media playlist."""
+    variant_dir = os.path.dirname(playlist_path)
+    peak = 0
+    total_bits = 0
+    total_seconds = 0.0
+    duration = None
+    byte_range = None
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            elif line.startswith('#EXT-X-BYTERANGE:'):
+                # Single-file fMP4: the segment is a length@offset slice of the rendition file
+                byte_range = int(line[len('#EXT-X-BYTERANGE:'):].split('@')[0])
+            elif line and not line.startswith('#') and duration:
+                if byte_range is not None:
+                    size = byte_range
+                else:
+                    segment_path = os.path.join(variant_dir, line)
+                    if not os.path.exists(segment_path):
+                        # Segments uploaded by chunk workers; advertise the nominal rate instead
+                        return 0, 0
+                    size = os.path.getsize(segment_path)
+                bits = size * 8
+                peak = max(peak, int(bits / duration))
+                total_bits += bits
+                total_seconds += duration
+                duration = None
+                byte_range = None
+    average = int(total_bits / total_seconds) if total_seconds else 0
+    return peak, average
+
+def encode_renditions_separately(input_path, renditions, output_dir, parallel, timeout=FFMPEG_TIMEOUT_SECONDS, chunk=None):
+    """One FFmpeg process per rendition, optionally run concurrently sized to the available vCPUs."""
+    if not parallel or len(renditions) < 2:
+        return {res: run_ffmpeg(build_rendition_command(input_path, res, params, output_dir, chunk=chunk), f"{res}p", timeout)
+                for res, params in renditions}
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(len(renditions), cpus))
+    threads = max(1, cpus // workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            res: executor.submit(
+                run_ffmpeg, build_rendition_command(input_path, res, params, output_dir, threads, chunk), f"{res}p", timeout
+            )
+            for res, params in renditions
+        }
+        return {res: future.result() for res, future in futures.items()}
+
+def encode_renditions(input_path, renditions, output_dir, deadline=None, chunk=None):
+    """Encode renditions per HLS_ENCODE_MODE. Returns {res: succeeded}."""
+    def remaining_timeout():
+        if deadline is None:
+            return FFMPEG_TIMEOUT_SECONDS
+        return max(1, min(FFMPEG_TIMEOUT_SECONDS, deadline - time.monotonic()))
+
+    if HLS_ENCODE_MODE == 'split':
+        label = "split renditions" if len(renditions) > 1 else f"{renditions[0][0]}p"
+        if chunk:
+            label += f" (chunk {chunk['index']})"
+        if run_ffmpeg(build_split_command(input_path, renditions, output_dir, chunk), label, remaining_timeout()):
+            return {res: True for res, _ in renditions}
+        # Salvage what we can one rendition at a time
+        print("Single-decode encode failed, falling back to per-rendition encodes")
+        return encode_renditions_separately(
+            input_path, renditions, output_dir, parallel=False, timeout=remaining_timeout(), chunk=chunk
+        )
+    return encode_renditions_separately(
+        input_path, renditions, output_dir, parallel=HLS_ENCODE_MODE == 'parallel', timeout=remaining_timeout(),
+        chunk=chunk
+    )
+
+def plan_chunks(probe):
+    """Time ranges for chunked encoding, or None when the source is short enough for one pass."""
+    if HLS_CHUNK_WORKERS not in ('local', 'lambda') or HLS_CHUNK_SECONDS <= 0:
+        return None
+    if not probe or probe['duration'] <= HLS_CHUNK_THRESHOLD_SECONDS:
+        return None
+    # Whole segments per chunk, so only the last segment of the video is ever short
+    length = max(1, HLS_CHUNK_SECONDS // HLS_SEGMENT_SECONDS) * HLS_SEGMENT_SECONDS
+    chunks = []
+    start = 0
+    while start < probe['duration']:
+        chunks.append({
+            'index': len(chunks),
+            'start': start,
+            'duration': round(min(length, probe['duration'] - start), 3),
+        })
+        start += length
+    return chunks
+
+def encode_chunk(input_path, chunk, renditions, output_dir, deadline=None):
+    """
+    Encode one chunk of every rendition into output_dir/{res}/c{index}_*.
+    Returns {res: chunk playlist text} (the chunk playlists are removed), or None on failure.
+    """
+    succeeded = encode_renditions(input_path, renditions, output_dir, deadline, chunk)
+    if not all(succeeded.get(res) for res, _ in renditions):
+        return None
+    playlists = {}
+    for res, _ in renditions:
+        playlist_path = os.path.join(output_dir, res, f"{chunk_prefix(chunk)}playlist.m3u8")
+        with open(playlist_path) as f:
+            playlists[res] = f.read()
+        os.remove(playlist_path)
+    return playlists
+
+def encode_chunks_locally(input_path, chunks, renditions, output_dir, deadline=None):
+    """Chunk encodes as concurrent FFmpeg processes in this invocation. Returns playlists per chunk."""
+    workers = min(len(chunks), HLS_CHUNK_CONCURRENCY, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda chunk: encode_chunk(input_path, chunk, renditions, output_dir, deadline), chunks
+        ))
+
+def stitch_playlists(chunk_playlists):
+    """
+    Join chunk media playlists into one VOD playlist. Chunks are separated by
+    EXT-X-DISCONTINUITY since each was encoded (and, for fMP4, initialised) on its own.
+    """
+    version = 3
+    target_duration = HLS_SEGMENT_SECONDS
+    body = []
+    for i, text in enumerate(chunk_playlists):
+        if i:
+            body.append("#EXT-X-DISCONTINUITY")
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith('#EXT-X-VERSION:'):
+                version = max(version, int(line.split(':', 1)[1]))
+            elif line.startswith('#EXT-X-TARGETDURATION:'):
+                target_duration = max(target_duration, int(line.split(':', 1)[1]))
+            elif line.startswith(('#EXTINF:', '#EXT-X-BYTERANGE:', '#EXT-X-MAP:')) or (line and not line.startswith('#')):
+                body.append(line)
+    lines = [
+        "#EXTM3U",
+        f"#EXT-X-VERSION:{version}",
+        f"#EXT-X-TARGETDURATION:{target_duration}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+    ]
+    return "\n".join(lines + body + ["#EXT-X-ENDLIST"]) + "\n"
+
+def write_master_playlist(output_dir, renditions, succeeded):
+    """Write master.m3u8 for the renditions that succeeded. Returns its path, or None if there are none."""
+    # fMP4 media playlists use EXT-X-MAP and byte ranges, which need version 7
+    master_playlist_lines = ["#EXTM3U", "#EXT-X-VERSION:7" if HLS_SEGMENT_FORMAT == 'fmp4' else "#EXT-X-VERSION:3"]
+    for res, params in renditions:
+        if not succeeded.get(res):
+            continue
+        peak, average = measured_bandwidth(os.path.join(output_dir, res, "playlist.m3u8"))
+        stream_info = f'#EXT-X-STREAM-INF:BANDWIDTH={peak or params["bandwidth"]}'
+        if average:
+            stream_info += f',AVERAGE-BANDWIDTH={average}'
+        master_playlist_lines.append(f'{stream_info},RESOLUTION={params["width"]}x{params["height"]}')
         master_playlist_lines.append(f"{res}/playlist.m3u8")
     
     # Write master playlist ONLY if we successfully generated at least one rendition
     # Check if we have any stream info lines
     if len(master_playlist_lines) <= 2:
-        print("Error: No HLS renditions were generated successfully")
         return None
         
     master_path = os.path.join(output_dir, "master.m3u8")
@@ -137,33 +627,168 @@ def generate_hls(input_path, output_dir):
     
     return master_path
 
-def upload_directory_to_s3(local_dir, bucket, s3_prefix):
-    """Upload all files from a local directory to S3"""
-    uploaded_files = []
+def generate_hls(input_path, output_dir, deadline=None, on_playable=None, encode_chunks=None, probe=None):
+    """
+    Generate HLS streams for video.
+    The ladder is planned from an ffprobe pass (see plan_renditions).
+    With on_playable in progressive mode, the smallest rendition is encoded
+    first and on_playable(master_path) is called as soon as a master playlist
+    referencing it exists; the rest of the ladder is then encoded and the
+    master rewritten to include it.
+    Long sources (see plan_chunks) are instead cut into chunks that
+    encode_chunks(input_path, chunks, renditions, output_dir, deadline) encodes
+    in parallel, returning each chunk's playlists; they are stitched into one
+    playlist per rendition. Chunked encodes are not published progressively;
+    if one fails, the source is encoded in a single pass as for short videos.
+    Pass probe to reuse an earlier probe_video result.
+    Returns path to master.m3u8
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if probe is None:
+        probe = probe_video(input_path)
+    if probe:
+        print(f"Source: {probe['width']}x{probe['height']} @ {probe['fps'] or 0:.2f}fps, "
+              f"{probe['duration']:.1f}s, audio={'yes' if probe['has_audio'] else 'no'}")
+    chunks = plan_chunks(probe)
+    if chunks:
+        # Local chunk encodes share this invocation's vCPUs, which HLS_ENCODE_SPEED already measures
+        parallelism = min(len(chunks), HLS_CHUNK_CONCURRENCY) if encode_chunks else 1
+        renditions = plan_renditions(probe, deadline, parallelism)
+        print(f"Encoding {len(chunks)} chunks of up to {chunks[0]['duration']}s")
+        try:
+            chunk_playlists = (encode_chunks or encode_chunks_locally)(input_path, chunks, renditions, output_dir, deadline)
+        except Exception as e:
+            print(f"Error: Chunk encoding raised: {e}")
+            chunk_playlists = None
+        if chunk_playlists and all(playlists is not None for playlists in chunk_playlists):
+            for res, _ in renditions:
+                os.makedirs(os.path.join(output_dir, res), exist_ok=True)
+                with open(os.path.join(output_dir, res, "playlist.m3u8"), "w") as f:
+                    f.write(stitch_playlists([playlists[res] for playlists in chunk_playlists]))
+                print(f"Generated HLS {res}p stream from {len(chunks)} chunks")
+            return write_master_playlist(output_dir, renditions, {res: True for res, _ in renditions})
+
+        print("Error: Chunked HLS encode failed, falling back to a single-pass encode")
+        # Drop partial chunk output so it is not uploaded next to the single-pass segments
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir, exist_ok=True)
+
+    renditions = plan_renditions(probe, deadline)
+
+    stages = [renditions]
+    if on_playable and HLS_PUBLISH_MODE == 'progressive' and len(renditions) > 1:
+        first = min(renditions, key=lambda item: item[1]["height"])
+        stages = [[first], [rendition for rendition in renditions if rendition is not first]]
+
+    succeeded = {}
+    master_path = None
+    for i, stage in enumerate(stages):
+        succeeded.update(encode_renditions(input_path, stage, output_dir, deadline))
+        for res, _ in stage:
+            if succeeded.get(res):
+                print(f"Generated HLS {res}p stream")
+        master_path = write_master_playlist(output_dir, renditions, succeeded) or master_path
+        if master_path and i < len(stages) - 1:
+            on_playable(master_path)
+
+    if not master_path:
+        print("Error: No HLS renditions were generated successfully")
+    return master_path
+
+def extract_offset(probe):
+    """Where posters and previews start: past intro fades and black frames, early enough to exist."""
+    if not probe or not probe['duration']:
+        return 0
+    return round(min(probe['duration'] * 0.1, 10), 3)
+
+def extract_poster_frame(input_path, output_path, probe=None):
+    """
+    Pick a poster frame with FFmpeg's thumbnail filter, which keeps the most
+    representative frame of a batch (the one closest to the batch's average
+    histogram) and so skips fades, flashes and cuts. Returns True on success.
+    """
+    command = [FFMPEG_PATH, "-y", "-ss", str(extract_offset(probe))] + ffmpeg_input_args(input_path) + [
+        "-vf", f"scale='min({VIDEO_POSTER_MAX_WIDTH},iw)':-2,thumbnail={VIDEO_POSTER_CANDIDATE_FRAMES}",
+        "-frames:v", "1",
+        output_path
+    ]
+    return run_ffmpeg(command, "poster frame", FFPROBE_TIMEOUT_SECONDS) and os.path.exists(output_path)
+
+def encode_preview_clip(input_path, output_path, probe=None):
+    """A short, muted, low-bitrate H.264 MP4 for looping on listing cards. Returns True on success."""
+    command = [FFMPEG_PATH, "-y", "-ss", str(extract_offset(probe))] + ffmpeg_input_args(input_path) + [
+        "-t", str(VIDEO_PREVIEW_SECONDS),
+        "-an",
+        "-vf", f"scale=-2:'min({VIDEO_PREVIEW_HEIGHT},ih)',fps=24,format=yuv420p",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", "30",
+        "-maxrate", "400000",
+        "-bufsize", "800000",
+        "-profile:v", "main",
+        # moov up front so the loop starts before the download finishes
+        "-movflags", "+faststart",
+        output_path
+    ]
+    return run_ffmpeg(command, "preview clip", FFMPEG_TIMEOUT_SECONDS) and os.path.exists(output_path)
+
+def content_type_for(filename):
+    if filename.endswith('.m3u8'):
+        return 'application/x-mpegURL'
+    if filename.endswith('.ts'):
+        return 'video/MP2T'
+    if filename.endswith('.mp4'):
+        return 'video/mp4'
+    if filename.endswith('.m4s'):
+        return 'video/iso.segment'
+    if filename.endswith('.webp'):
+        return 'image/webp'
+    return 'application/octet-stream'
+
+def upload_directory_to_s3(local_dir, bucket, s3_prefix, skip_keys=frozenset()):
+    """
+    Upload all files from a local directory to S3, UPLOAD_CONCURRENCY at a time.
+
+    Uploads happen in three waves so a player can never find a playlist that
+    references missing objects: media segments first, then variant playlists,
+    then the top-level master.m3u8 last. Keys in skip_keys were published
+    earlier and are not uploaded again. Returns all keys in directory-walk
+    order (master playlist first), as before.
+    """
+    uploads = []
     for root, dirs, files in os.walk(local_dir):
         for file in files:
             local_path = os.path.join(root, file)
             relative_path = os.path.relpath(local_path, local_dir)
             s3_key = f"{s3_prefix}/{relative_path}".replace("\\", "/")
-            
-            # Set content type
-            content_type = 'application/octet-stream'
-            if file.endswith('.m3u8'):
-                content_type = 'application/x-mpegURL'
-            elif file.endswith('.ts'):
-                content_type = 'video/MP2T'
-            elif file.endswith('.webp'):
-                content_type = 'image/webp'
-            
-            s3.upload_file(
-                local_path, 
-                bucket, 
-                s3_key,
-                ExtraArgs={'ContentType': content_type}
-            )
-            uploaded_files.append(s3_key)
-    
-    return uploaded_files
+            uploads.append((local_path, s3_key, content_type_for(file)))
+
+    def wave(upload):
+        local_path, s3_key, _ = upload
+        if not s3_key.endswith('.m3u8'):
+            return 0
+        return 2 if os.path.dirname(local_path) == local_dir else 1
+
+    def upload_one(upload):
+        local_path, s3_key, content_type = upload
+        extra_args = {'ContentType': content_type}
+        if HLS_PUBLISH_MODE == 'progressive' and wave(upload) == 2:
+            # The master gains renditions after first publish
+            extra_args['CacheControl'] = 'no-cache'
+        s3.upload_file(
+            local_path, 
+            bucket, 
+            s3_key,
+            ExtraArgs=extra_args
+        )
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY) as executor:
+        for current_wave in (0, 1, 2):
+            batch = [upload for upload in uploads if wave(upload) == current_wave and upload[1] not in skip_keys]
+            # list() re-raises the first failed upload before the next wave starts
+            list(executor.map(upload_one, batch))
+
+    return [s3_key for _, s3_key, _ in uploads]
 
 def get_catalog_data(bucket):
     try:
@@ -177,34 +802,115 @@ def get_catalog_data(bucket):
             return {'version': '1.0', 'lastUpdated': datetime.utcnow().isoformat() + 'Z', 'products': []}
         raise
 
-def save_catalog_data(bucket, catalog):
-    catalog['lastUpdated'] = datetime.utcnow().isoformat() + 'Z'
-    s3.put_object(
-        Bucket=bucket,
-        Key=CATALOG_KEY,
-        Body=json.dumps(catalog, indent=2),
-        ContentType='application/json'
-    )
+def build_product_lookup(products):
+    """Map str(product_id) and str(handle) to list positions; the first product wins on clashes."""
+    lookup = {}
+    for pos in range(len(products) - 1, -1, -1):
+        product = products[pos]
+        lookup[str(product.get('handle'))] = pos
+        lookup[str(product.get('product_id'))] = pos
+    return lookup
 
-def update_product_catalog_entry(bucket, product_key, results):
-    if not results:
-        return
+def read_json_with_etag(bucket, key):
+    """Fetch and parse a JSON object. Returns (data, etag), or (None, None) if it does not exist."""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8')), response.get('ETag')
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'NoSuchKey':
+            return None, None
+        raise
 
-    catalog = get_catalog_data(bucket)
-    products = catalog.get('products', [])
-    target_index = next(
-        (
-            index for index, product in enumerate(products)
-            if str(product.get('handle')) == str(product_key) or str(product.get('product_id')) == str(product_key)
-        ),
-        -1,
+def read_json(bucket, key):
+    """Fetch and parse a JSON object, or None if it does not exist."""
+    return read_json_with_etag(bucket, key)[0]
+
+def write_json(bucket, key, data, indent=2, if_match=None, create_only=False):
+    """Write a JSON object; if_match/create_only make the write conditional."""
+    params = {
+        'Bucket': bucket,
+        'Key': key,
+        'Body': json.dumps(data, indent=indent),
+        'ContentType': 'application/json'
+    }
+    if if_match:
+        params['IfMatch'] = if_match
+    elif create_only:
+        params['IfNoneMatch'] = '*'
+    s3.put_object(**params)
+
+def is_write_conflict(error):
+    """True for the errors S3 returns when a conditional write lost a race."""
+    return str(error.response.get('Error', {}).get('Code')) in (
+        'PreconditionFailed', 'ConditionalRequestConflict', '412', '409'
     )
 
-    if target_index < 0:
-        print(f"WARNING: Product {product_key} not found in catalog for media update")
-        return
+def update_json(bucket, key, mutate, default=None, indent=2):
+    """
+    Optimistic read-modify-write of a JSON object using If-Match on its ETag.
+
+    mutate(current) receives a freshly read object (default() when it does
+    not exist, or None without a default), may change it in place and returns
+    the object to write, or None to skip the write. When a concurrent
+    invocation wrote first, the object is re-read and mutate() runs again, so
+    parallel uploads for the same product or project merge instead of
+    overwriting each other. Returns the written object or None.
+    """
+    for attempt in range(WRITE_MAX_ATTEMPTS):
+        current, etag = read_json_with_etag(bucket, key)
+        if current is None and default:
+            current = default()
+        updated = mutate(current)
+        if updated is None:
+            return None
+        try:
+            write_json(bucket, key, updated, indent=indent, if_match=etag, create_only=etag is None)
+            return updated
+        except ClientError as e:
+            if not is_write_conflict(e) or attempt == WRITE_MAX_ATTEMPTS - 1:
+                raise
+            print(f"Write conflict on {key}, retrying (attempt {attempt + 1})")
+            time.sleep(WRITE_RETRY_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+def build_listing_record(product):
+    record = {key: product[key] for key in LISTING_FIELDS if key in product}
+    gallery_images = product.get('gallery_images')
+    record['gallery_images'] = gallery_images[:LISTING_GALLERY_IMAGES] if isinstance(gallery_images, list) else []
+    return record
 
-    product = products[target_index]
+def media_image_entry(res, url, alt=''):
+    """
+    Gallery entry for a processed upload: dimensions and srcset variants for
+    images, poster image and preview clip for videos.
+    """
+    entry = {'url': url, 'alt': alt}
+    if res.get('variants'):
+        entry['width'] = res.get('width')
+        entry['height'] = res.get('height')
+        entry['variants'] = res['variants']
+    entry.update(video_extras(res))
+    return entry
+
+def video_extras(res):
+    """Poster URL and preview clip key recorded next to a video's HLS master."""
+    extras = {}
+    if res.get('poster'):
+        extras['poster'] = res['poster']['url']
+    if res.get('preview'):
+        extras['preview'] = res['preview']
+    return extras
+
+def merge_extras(entry, extras):
+    """Add extras missing from an entry recorded earlier (e.g. by a progressive publish). Returns True if it changed."""
+    changed = False
+    for key, value in extras.items():
+        if entry.get(key) != value:
+            entry[key] = value
+            changed = True
+    return changed
+
+def apply_media_results(product, results):
+    """Merge processed media into a product record in place. Returns True if it changed."""
     gallery_images = product.get('gallery_images') or []
     if not isinstance(gallery_images, list):
         gallery_images = []
@@ -231,8 +937,11 @@ def update_product_catalog_entry(bucket, product_key, results):
             updated = True
             continue
 
-        if not any((isinstance(img, dict) and img.get('url') == final_src) for img in gallery_images):
-            gallery_images.append({'url': final_src, 'alt': product.get('title', '')})
+        existing = next((img for img in gallery_images if isinstance(img, dict) and img.get('url') == final_src), None)
+        if existing is None:
+            gallery_images.append(media_image_entry(res, final_src, product.get('title', '')))
+            updated = True
+        elif merge_extras(existing, video_extras(res)):
             updated = True
 
         if final_src not in body_images:
@@ -245,10 +954,506 @@ def update_product_catalog_entry(bucket, product_key, results):
         if not product.get('primary_image') and gallery_images:
             product['primary_image'] = gallery_images[0].get('url', '')
         product['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-        products[target_index] = product
-        catalog['products'] = products
-        save_catalog_data(bucket, catalog)
-        print(f"SUCCESS: Updated catalog product {product_key} after media processing")
+    return updated
+
+def update_product_catalog_entries(bucket, results_by_product):
+    """
+    Apply processed media results for several products.
+    Single-object storage rewrites the catalog once for the whole batch.
+    """
+    results_by_product = {key: results for key, results in results_by_product.items() if results}
+    if not results_by_product:
+        return
+
+    if CATALOG_STORAGE == 'sharded':
+        # Until the API writes the first listing index the legacy single object is authoritative.
+        index = read_json(bucket, CATALOG_INDEX_KEY)
+        if index is not None:
+            update_sharded_product_entries(bucket, index, results_by_product)
+            return
+
+    def apply(catalog):
+        if catalog is None:
+            return None
+        products = catalog.get('products', [])
+        lookup = build_product_lookup(products)
+        updated = False
+        for product_key, results in results_by_product.items():
+            target_index = lookup.get(str(product_key), -1)
+            if target_index < 0:
+                print(f"WARNING: Product {product_key} not found in catalog for media update")
+                continue
+            if apply_media_results(products[target_index], results):
+                updated = True
+        if not updated:
+            return None
+        catalog['lastUpdated'] = datetime.utcnow().isoformat() + 'Z'
+        return catalog
+
+    if update_json(bucket, CATALOG_KEY, apply) is not None:
+        print(f"SUCCESS: Updated catalog products {', '.join(results_by_product)} after media processing")
+
+def update_sharded_product_entries(bucket, index, results_by_product):
+    """Sharded storage: rewrite each affected product object, then the listing index once."""
+    lookup = build_product_lookup(index.get('products', []))
+    written = {}
+    for product_key, results in results_by_product.items():
+        record_index = lookup.get(str(product_key), -1)
+        if record_index < 0:
+            print(f"WARNING: Product {product_key} not found in catalog index for media update")
+            continue
+
+        record = index['products'][record_index]
+        product_id = str(record.get('product_id'))
+        item_key = f"{CATALOG_ITEMS_PREFIX}{product_id}.json"
+
+        def apply_item(product, record=record, product_id=product_id, results=results):
+            if product is None:
+                legacy = get_catalog_data(bucket)
+                legacy_index = build_product_lookup(legacy['products']).get(product_id, -1)
+                product = legacy['products'][legacy_index] if legacy_index >= 0 else dict(record)
+            return product if apply_media_results(product, results) else None
+
+        product = update_json(bucket, item_key, apply_item)
+        if product is not None:
+            written[product_id] = product
+            print(f"SUCCESS: Updated catalog product {product_key} ({item_key}) after media processing")
+
+    if not written:
+        return
+
+    def apply_index(current):
+        if current is None:
+            return None
+        products = current.get('products', [])
+        positions = build_product_lookup(products)
+        for product_id, product in written.items():
+            pos = positions.get(product_id, -1)
+            if pos >= 0:
+                products[pos] = build_listing_record(product)
+        current['lastUpdated'] = datetime.utcnow().isoformat() + 'Z'
+        return current
+
+    update_json(bucket, CATALOG_INDEX_KEY, apply_index, indent=None)
+
+def apply_project_results(metadata, results):
+    """Merge processed media into project metadata in place. Returns True if it changed."""
+    updated = False
+
+    # Check if this was a cover video upload
+    cover_result = next((r for r in results if 'cover' in r['original']), None)
+    if cover_result:
+        if cover_result['type'] == 'video':
+            # path/to/master.m3u8
+            metadata['cover'] = f"{cover_result['converted'][0]}"
+            # Listing cards show these instead of starting an HLS stream
+            extras = video_extras(cover_result)
+            if extras.get('poster'):
+                metadata['coverPoster'] = extras['poster']
+            if extras.get('preview'):
+                metadata['coverPreview'] = extras['preview']
+            updated = True
+        elif cover_result['type'] == 'other':
+            metadata['cover'] = cover_result['converted']
+            updated = True
+
+    # Add new media items
+    for res in results:
+        if 'cover' in res['original']: continue
+
+        media_item = {'type': res['type'], 'src': ''}
+        if res.get('variants'):
+            media_item.update(width=res.get('width'), height=res.get('height'), variants=res['variants'])
+        media_item.update(video_extras(res))
+
+        if res['type'] == 'video':
+            # Use first file (master.m3u8) as src
+            media_item['src'] = res['converted'][0] if isinstance(res['converted'], list) else res['converted']
+        else:
+            media_item['src'] = res['converted']
+
+        # Avoid duplicates
+        existing = next((m for m in metadata.get('media', []) if m['src'] == media_item['src']), None)
+        if existing is None:
+            metadata.setdefault('media', []).append(media_item)
+            updated = True
+        elif merge_extras(existing, video_extras(res)):
+            updated = True
+
+    return updated
+
+def update_project_metadata_entry(bucket, category, project_id, results):
+    """Apply processed media results to a project's metadata.json."""
+    metadata_key = f"projects/{category}/{project_id}/metadata.json"
+
+    def apply(metadata):
+        if metadata is None:
+            print(f"ERROR: Could not load/update metadata at {metadata_key}: not found")
+            return None
+        if not apply_project_results(metadata, results):
+            return None
+        metadata['updatedAt'] = datetime.utcnow().isoformat() + "Z"
+        return metadata
+
+    metadata = update_json(bucket, metadata_key, apply)
+    if metadata is not None:
+        print(f"SUCCESS: Updated metadata at: s3://{bucket}/{metadata_key}")
+        print(f"Current media count: {len(metadata.get('media', []))}")
+        update_project_summary(bucket, category, project_id, metadata)
+
+def project_summary(metadata):
+    """The projects.json listing fields for a project's metadata."""
+    summary = {key: metadata.get(key) or '' for key in PROJECT_SUMMARY_FIELDS}
+    summary['mediaCount'] = len(metadata.get('media') or [])
+    return summary
+
+def update_project_summary(bucket, category, project_id, metadata):
+    """Copy a project's new cover/poster/media count into its projects.json entry."""
+    summary = project_summary(metadata)
+
+    def apply(manifest):
+        if manifest is None:
+            return None
+        entry = next(
+            (p for p in manifest.get('projects', []) if p.get('id') == project_id and p.get('category') == category),
+            None
+        )
+        if entry is None or all(entry.get(key) == value for key, value in summary.items()):
+            return None
+        entry.update(summary)
+        manifest['lastUpdated'] = datetime.utcnow().isoformat() + "Z"
+        return manifest
+
+    try:
+        update_json(bucket, PROJECTS_MANIFEST_KEY, apply)
+    except Exception as e:
+        # metadata.json is already written; the listing catches up on the next write
+        print(f"ERROR: Could not update {PROJECTS_MANIFEST_KEY} summary for {category}/{project_id}: {e}")
+
+def update_target_entry(bucket, target, results):
+    """Apply results to one product (catalog) or project (metadata.json) target."""
+    if target[0] == 'product':
+        update_product_catalog_entries(bucket, {target[1]: results})
+    else:
+        _, category, project_id = target
+        update_project_metadata_entry(bucket, category, project_id, results)
+
+def parse_upload_key(s3_key):
+    """
+    Work out where an uploaded object belongs.
+    Returns None for keys that do not match a supported format.
+    """
+    # Parse supported key formats
+    parts = s3_key.split('/')
+    if len(parts) < 4 or parts[0] != 'uploads':
+        print(f"Skipping invalid key format: {s3_key}")
+        return None
+
+    upload_type = parts[1]
+    is_cover_file = '/cover/' in s3_key
+
+    if upload_type == 'products':
+        if len(parts) < 5:
+            print(f"Skipping invalid product upload key format: {s3_key}")
+            return None
+        product_key = parts[2]
+        output_prefix = f"catalog/products/{product_key}/media"
+        if is_cover_file:
+            output_prefix = f"catalog/products/{product_key}/media/cover"
+        target = ('product', product_key)
+    else:
+        if len(parts) < 5:
+            print(f"Skipping invalid project upload key format: {s3_key}")
+            return None
+        category = parts[1]
+        project_id = parts[2]
+        if is_cover_file:
+            output_prefix = f"projects/{category}/{project_id}/media/cover"
+        else:
+            output_prefix = f"projects/{category}/{project_id}/media"
+        target = ('project', category, project_id)
+
+    return {
+        's3_key': s3_key,
+        'filename': parts[-1],
+        'output_prefix': output_prefix,
+        'target': target,
+    }
+
+def upload_webp_variants(bucket, prefix, outputs):
+    """
+    put_object each convert_image_to_webp output under prefix.
+    Returns the full variant's url and size plus all variants, smallest first (srcset order).
+    """
+    variants = []
+    for output in outputs:
+        s3_output_key = f"{prefix}/{output['filename']}"
+        s3.put_object(
+            Bucket=bucket,
+            Key=s3_output_key,
+            Body=output['body'],
+            ContentType='image/webp'
+        )
+        variants.append({
+            'name': output['name'],
+            'url': s3_output_key,
+            'width': output['width'],
+            'height': output['height'],
+        })
+    full = next(variant for variant in variants if variant['name'] == 'full')
+    return {
+        'url': full['url'],
+        'width': full['width'],
+        'height': full['height'],
+        'variants': variants[::-1]
+    }
+
+def process_image(bucket, upload, source):
+    """Convert an uploaded image (path or file-like) and put each variant straight from memory."""
+    s3_key = upload['s3_key']
+    output_prefix = upload['output_prefix']
+    base_name = os.path.splitext(upload['filename'])[0]
+
+    # Convert to the WebP variant ladder
+    outputs = convert_image_to_webp(source, base_name)
+    if not outputs:
+        return None
+
+    image = upload_webp_variants(bucket, output_prefix, outputs)
+    print(f"Uploaded WebP: {len(image['variants'])} variants under {output_prefix}/{base_name}")
+    return {
+        'type': 'image',
+        'original': s3_key,
+        'converted': image['url'],
+        'width': image['width'],
+        'height': image['height'],
+        'variants': image['variants']
+    }
+
+def delete_keys(bucket, keys):
+    """Delete keys with DeleteObjects, 1000 per request. Failures are logged, not raised."""
+    for i in range(0, len(keys), 1000):
+        batch = keys[i:i + 1000]
+        try:
+            response = s3.delete_objects(
+                Bucket=bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            for error in response.get('Errors', []):
+                print(f"WARNING: Could not delete {error.get('Key')}: {error.get('Message')}")
+        except Exception as e:
+            print(f"WARNING: Could not delete {len(batch)} chunk segments: {e}")
+
+def invoke_chunk_workers(bucket, source_key, s3_prefix, remote_keys):
+    """
+    encode_chunks for generate_hls that runs each chunk in its own invocation
+    of this function. Workers upload their segments under s3_prefix themselves;
+    their keys are collected in remote_keys. If any chunk fails, the segments
+    already uploaded are deleted and remote_keys is emptied, since generate_hls
+    then falls back to a single-pass encode.
+    """
+    def encode_chunks(input_path, chunks, renditions, output_dir, deadline=None):
+        def invoke(chunk):
+            payload = {
+                'action': 'encode_chunk',
+                'bucket': bucket,
+                'source_key': source_key,
+                's3_prefix': s3_prefix,
+                'chunk': chunk,
+                'renditions': renditions,
+            }
+            try:
+                response = get_lambda_client().invoke(
+                    FunctionName=os.environ['AWS_LAMBDA_FUNCTION_NAME'],
+                    InvocationType='RequestResponse',
+                    Payload=json.dumps(payload).encode('utf-8')
+                )
+                body = json.loads(response['Payload'].read() or b'null')
+            except Exception as e:
+                print(f"ERROR: Chunk {chunk['index']} worker invocation failed: {e}")
+                return None
+            if response.get('FunctionError') or not body:
+                print(f"ERROR: Chunk {chunk['index']} worker failed: {body}")
+                return None
+            remote_keys.extend(body['keys'])
+            return body['playlists']
+
+        with ThreadPoolExecutor(max_workers=min(len(chunks), HLS_CHUNK_CONCURRENCY)) as executor:
+            chunk_playlists = list(executor.map(invoke, chunks))
+        if any(playlists is None for playlists in chunk_playlists) and remote_keys:
+            delete_keys(bucket, remote_keys)
+            del remote_keys[:]
+        return chunk_playlists
+
+    return encode_chunks
+
+def encode_chunk_worker(event, context):
+    """Chunk worker invocation (see invoke_chunk_workers): encode one chunk and upload its segments."""
+    bucket = event['bucket']
+    chunk = event['chunk']
+    renditions = [(res, params) for res, params in event['renditions']]
+    print(f"Encoding chunk {chunk['index']} of {event['source_key']} ({chunk['start']}s +{chunk['duration']}s)")
+    source_url = s3.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': event['source_key']},
+        ExpiresIn=VIDEO_INPUT_URL_EXPIRES
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        playlists = encode_chunk(source_url, chunk, renditions, tmpdir, invocation_deadline(context))
+        if playlists is None:
+            # Surfaces as FunctionError to the coordinating invocation
+            raise RuntimeError(f"Chunk {chunk['index']} encode failed")
+        keys = upload_directory_to_s3(tmpdir, bucket, event['s3_prefix'])
+    return {'playlists': playlists, 'keys': keys}
+
+def process_video(bucket, upload, source, output_dir, deadline=None):
+    """Convert a video (local path or presigned URL) to HLS and upload it. Returns None on failure."""
+    filename = upload['filename']
+    base_name = os.path.splitext(filename)[0]
+    hls_output_dir = os.path.join(output_dir, base_name)
+    s3_prefix = f"{upload['output_prefix']}/{base_name}"
+    published = set()
+    # Segments uploaded directly by chunk workers
+    remote_keys = []
+    encode_chunks = None
+    if HLS_CHUNK_WORKERS == 'lambda' and os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        encode_chunks = invoke_chunk_workers(bucket, upload['s3_key'], s3_prefix, remote_keys)
+
+    extras_dir = os.path.join(output_dir, f"{base_name}-extras")
+    os.makedirs(extras_dir, exist_ok=True)
+    result = {
+        'type': 'video',
+        'original': upload['s3_key'],
+    }
+
+    probe = probe_video(source)
+
+    # Poster first (one frame, seconds) so even a progressive first publish has it
+    poster_frame = os.path.join(extras_dir, "poster.png")
+    if extract_poster_frame(source, poster_frame, probe):
+        outputs = convert_image_to_webp(poster_frame, "poster")
+        if outputs:
+            result['poster'] = upload_webp_variants(bucket, s3_prefix, outputs)
+            print(f"Uploaded poster: {result['poster']['url']}")
+
+    def publish_first_rendition(master_path):
+        # Make the video playable now; the batch-end metadata write then only adds what is new
+        uploaded = upload_directory_to_s3(hls_output_dir, bucket, s3_prefix)
+        published.update(key for key in uploaded if not key.endswith('/master.m3u8'))
+        print(f"Published first HLS rendition: {len(uploaded)} files")
+        try:
+            update_target_entry(bucket, upload['target'], [dict(result, converted=uploaded)])
+        except Exception as e:
+            print(f"WARNING: Early metadata update failed for {upload['s3_key']}: {e}")
+
+    # Convert to HLS
+    master_path = generate_hls(
+        source, hls_output_dir, deadline, on_playable=publish_first_rendition, encode_chunks=encode_chunks,
+        probe=probe
+    )
+    if not master_path or not os.path.exists(master_path):
+        print(f"Failed to generate HLS for {filename}")
+        # Leave no partial segments behind for a retry into the same directory
+        shutil.rmtree(hls_output_dir, ignore_errors=True)
+        return None
+    # Upload all HLS files
+    uploaded = upload_directory_to_s3(
+        hls_output_dir, 
+        bucket, 
+        s3_prefix,
+        skip_keys=published
+    ) + remote_keys
+    print(f"Uploaded HLS: {len(uploaded) - len(published)} files")
+    result['converted'] = uploaded
+
+    preview_path = os.path.join(extras_dir, "preview.mp4")
+    if VIDEO_PREVIEW_SECONDS > 0 and encode_preview_clip(source, preview_path, probe):
+        preview_key = f"{s3_prefix}/preview.mp4"
+        s3.upload_file(preview_path, bucket, preview_key, ExtraArgs={'ContentType': 'video/mp4'})
+        result['preview'] = preview_key
+        print(f"Uploaded preview: {preview_key}")
+
+    return result
+
+def process_upload(bucket, upload, deadline=None):
+    """Convert one uploaded object. Returns its result dict, or None if conversion failed."""
+    s3_key = upload['s3_key']
+    filename = upload['filename']
+    output_prefix = upload['output_prefix']
+    print(f"Processing: {s3_key}")
+
+    if not is_image(filename) and not is_video(filename):
+        # Copy as-is for other file types
+        s3_output_key = f"{output_prefix}/{filename}"
+        s3.copy_object(
+            Bucket=bucket,
+            CopySource={'Bucket': bucket, 'Key': s3_key},
+            Key=s3_output_key
+        )
+        return {
+            'type': 'other',
+            'original': s3_key,
+            'converted': s3_output_key
+        }
+
+    size = upload.get('size')
+    if is_image(filename) and size is not None and size <= IMAGE_MEMORY_MAX_BYTES:
+        # Common catalog-photo case: no /tmp round-trip
+        body = s3.get_object(Bucket=bucket, Key=s3_key)['Body'].read()
+        print(f"Read into memory: {s3_key} ({len(body)} bytes)")
+        return process_image(bucket, upload, io.BytesIO(body))
+
+    # Create temp directories
+    with tempfile.TemporaryDirectory() as tmpdir:
+        input_path = os.path.join(tmpdir, filename)
+        output_dir = os.path.join(tmpdir, 'output')
+        os.makedirs(output_dir, exist_ok=True)
+
+        if is_video(filename) and VIDEO_INPUT_MODE == 'url':
+            # FFmpeg range-reads the object itself; encoding starts with the first bytes
+            source_url = s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': bucket, 'Key': s3_key},
+                ExpiresIn=VIDEO_INPUT_URL_EXPIRES
+            )
+            result = process_video(bucket, upload, source_url, output_dir, deadline)
+            if result:
+                return result
+            print(f"Streaming encode failed for {s3_key}, retrying from a local download")
+        
+        # Download file from S3
+        s3.download_file(bucket, s3_key, input_path)
+        print(f"Downloaded: {s3_key}")
+        
+        if is_image(filename):
+            return process_image(bucket, upload, input_path)
+        
+        return process_video(bucket, upload, input_path, output_dir, deadline)
+
+def invocation_deadline(context):
+    """Absolute time.monotonic() deadline for encode planning, or None outside Lambda."""
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        return time.monotonic() + context.get_remaining_time_in_millis() / 1000.0
+    return None
+
+def expand_records(event):
+    """
+    Yield (item_identifier, s3_record) pairs. Direct S3 notifications are
+    identified by object key; S3 notifications delivered through SQS by the
+    SQS messageId, so batchItemFailures can be reported back to the queue.
+    """
+    for record in event.get('Records', []):
+        if record.get('eventSource') == 'aws:sqs':
+            try:
+                body = json.loads(record.get('body') or '{}')
+            except ValueError:
+                print(f"Skipping unreadable SQS message {record.get('messageId')}")
+                continue
+            for inner in body.get('Records', []):
+                if 's3' in inner:
+                    yield record['messageId'], inner
+        elif 's3' in record:
+            yield unquote_plus(record['s3']['object']['key']), record
 
 def handler(event, context):
     """
@@ -257,187 +1462,90 @@ def handler(event, context):
     Expected S3 key formats:
     uploads/{category}/{project-id}/original/{filename}
     uploads/products/{product-handle-or-id}/{cover|original}/{filename}
+
+    Records are converted concurrently (RECORD_CONCURRENCY) and grouped by
+    product or project, so each target's metadata/catalog is written once
+    per batch. For SQS-delivered batches failed items are returned as
+    batchItemFailures; direct S3 notifications are async invokes that ignore
+    them, so any failure is raised after the metadata writes to let Lambda
+    retry the event.
+
+    Also serves chunk-encode invocations ({"action": "encode_chunk"}) made by
+    this function when it fans out a long video.
     """
+    if event.get('action') == 'encode_chunk':
+        return encode_chunk_worker(event, context)
+
     print(f"Event: {json.dumps(event)}")
     
-    bucket = os.environ.get('BUCKET_NAME')
-    if not bucket:
-        # Get bucket from event
-        bucket = event['Records'][0]['s3']['bucket']['name']
-    
+    deadline = invocation_deadline(context)
+
+    items = []
+    for item_id, record in expand_records(event):
+        bucket = os.environ.get('BUCKET_NAME') or record['s3']['bucket']['name']
+        upload = parse_upload_key(unquote_plus(record['s3']['object']['key']))
+        if upload:
+            upload['size'] = record['s3']['object'].get('size')
+            items.append((item_id, bucket, upload))
+
+    def convert(item):
+        item_id, bucket, upload = item
+        try:
+            return process_upload(bucket, upload, deadline)
+        except Exception as e:
+            print(f"ERROR: Failed to process {upload['s3_key']}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=RECORD_CONCURRENCY) as executor:
+        converted = list(executor.map(convert, items))
+
+    failed_items = set()
     results = []
-    
-    for record in event.get('Records', []):
-        s3_key = unquote_plus(record['s3']['object']['key'])
-        print(f"Processing: {s3_key}")
-        
-        # Parse supported key formats
-        parts = s3_key.split('/')
-        if len(parts) < 4 or parts[0] != 'uploads':
-            print(f"Skipping invalid key format: {s3_key}")
+    # (bucket, target) -> [(item_id, result)]
+    groups = {}
+    for item, result in zip(items, converted):
+        item_id, bucket, upload = item
+        if result is None:
+            failed_items.add(item_id)
             continue
+        results.append(result)
+        groups.setdefault((bucket, upload['target']), []).append((item_id, result))
 
-        upload_type = parts[1]
-        is_product_upload = upload_type == 'products'
+    # After processing, update metadata catalog/project metadata: one write per target
+    products_by_bucket = {}
+    for (bucket, target), entries in groups.items():
+        if target[0] == 'product':
+            products_by_bucket.setdefault(bucket, {})[target[1]] = entries
+            continue
+        try:
+            update_target_entry(bucket, target, [result for _, result in entries])
+        except Exception as e:
+            print(f"ERROR: General metadata update failure: {e}")
+            failed_items.update(item_id for item_id, _ in entries)
 
-        if is_product_upload:
-            if len(parts) < 5:
-                print(f"Skipping invalid product upload key format: {s3_key}")
-                continue
-            product_key = parts[2]
-            filename = parts[-1]
-            output_prefix = f"catalog/products/{product_key}/media"
-            is_cover_file = '/cover/' in s3_key
-            if is_cover_file:
-                output_prefix = f"catalog/products/{product_key}/media/cover"
-        else:
-            if len(parts) < 5:
-                print(f"Skipping invalid project upload key format: {s3_key}")
-                continue
-            category = parts[1]
-            project_id = parts[2]
-            filename = parts[-1]
-            is_cover_file = '/cover/' in s3_key
-            if is_cover_file:
-                output_prefix = f"projects/{category}/{project_id}/media/cover"
-            else:
-                output_prefix = f"projects/{category}/{project_id}/media"
-
-        filename = parts[-1]
-        
-        # Create temp directories
-        with tempfile.TemporaryDirectory() as tmpdir:
-            input_path = os.path.join(tmpdir, filename)
-            output_dir = os.path.join(tmpdir, 'output')
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Download file from S3
-            s3.download_file(bucket, s3_key, input_path)
-            print(f"Downloaded: {s3_key}")
-            
-            if is_image(filename):
-                # Convert to WebP
-                base_name = os.path.splitext(filename)[0]
-                webp_path = os.path.join(output_dir, f"{base_name}.webp")
-                
-                if convert_image_to_webp(input_path, webp_path):
-                    s3_output_key = f"{output_prefix}/{base_name}.webp"
-                    s3.upload_file(
-                        webp_path, 
-                        bucket, 
-                        s3_output_key,
-                        ExtraArgs={'ContentType': 'image/webp'}
-                    )
-                    results.append({
-                        'type': 'image',
-                        'original': s3_key,
-                        'converted': s3_output_key
-                    })
-                    print(f"Uploaded WebP: {s3_output_key}")
-            
-            elif is_video(filename):
-                # Convert to HLS
-                base_name = os.path.splitext(filename)[0]
-                hls_output_dir = os.path.join(output_dir, base_name)
-                
-                master_path = generate_hls(input_path, hls_output_dir)
-                if master_path and os.path.exists(master_path):
-                    # Upload all HLS files
-                    uploaded = upload_directory_to_s3(
-                        hls_output_dir, 
-                        bucket, 
-                        f"{output_prefix}/{base_name}"
-                    )
-                    results.append({
-                        'type': 'video',
-                        'original': s3_key,
-                        'converted': uploaded
-                    })
-                    print(f"Uploaded HLS: {len(uploaded)} files")
-                else:
-                    print(f"Failed to generate HLS for {filename}")
-            
-            else:
-                # Copy as-is for other file types
-                s3_output_key = f"{output_prefix}/{filename}"
-                s3.copy_object(
-                    Bucket=bucket,
-                    CopySource={'Bucket': bucket, 'Key': s3_key},
-                    Key=s3_output_key
-                )
-                results.append({
-                    'type': 'other',
-                    'original': s3_key,
-                    'converted': s3_output_key
-                })
-        
-        # After processing, update metadata catalog/project metadata.
-        if results and is_product_upload:
-            try:
-                update_product_catalog_entry(bucket, product_key, results)
-            except Exception as e:
-                print(f"ERROR: Failed to update product catalog entry {product_key}: {e}")
-        elif results:
-            try:
-                metadata_key = f"projects/{category}/{project_id}/metadata.json"
-                try:
-                    response = s3.get_object(Bucket=bucket, Key=metadata_key)
-                    metadata = json.loads(response['Body'].read().decode('utf-8'))
-                    
-                    # Update media list
-                    updated = False
-                    
-                    # Check if this was a cover video upload
-                    cover_result = next((r for r in results if 'cover' in r['original']), None)
-                    if cover_result:
-                        if cover_result['type'] == 'video':
-                            # path/to/master.m3u8
-                            metadata['cover'] = f"{cover_result['converted'][0]}" 
-                            updated = True
-                        elif cover_result['type'] == 'other':
-                             metadata['cover'] = cover_result['converted']
-                             updated = True
-                    
-                    # Add new media items
-                    for res in results:
-                        if 'cover' in res['original']: continue
-                        
-                        media_item = {'type': res['type'], 'src': ''}
-                        
-                        if res['type'] == 'video':
-                            # Use first file (master.m3u8) as src
-                            media_item['src'] = res['converted'][0] if isinstance(res['converted'], list) else res['converted']
-                        else:
-                            media_item['src'] = res['converted']
-                            
-                        # Avoid duplicates
-                        if not any(m['src'] == media_item['src'] for m in metadata.get('media', [])):
-                            metadata['media'].append(media_item)
-                            updated = True
-                    
-                    # Upload to S3
-                    if updated:
-                        metadata['updatedAt'] = datetime.utcnow().isoformat() + "Z"
-                        s3.put_object(
-                            Bucket=bucket,
-                            Key=metadata_key,
-                            Body=json.dumps(metadata, indent=2),
-                            ContentType='application/json'
-                        )
-                        print(f"SUCCESS: Updated metadata at: s3://{bucket}/{metadata_key}")
-                        print(f"Current media count: {len(metadata.get('media', []))}")
-                    
-                except ClientError as e:
-                    print(f"ERROR: Could not load/update metadata at {metadata_key}: {e}")
-            except Exception as e:
-                print(f"ERROR: General metadata update failure: {e}")
-        else:
-            print("WARNING: No results to update in metadata")
+    for bucket, entries_by_product in products_by_bucket.items():
+        try:
+            update_product_catalog_entries(bucket, {
+                product_key: [result for _, result in entries]
+                for product_key, entries in entries_by_product.items()
+            })
+        except Exception as e:
+            print(f"ERROR: Failed to update product catalog entries {', '.join(entries_by_product)}: {e}")
+            for entries in entries_by_product.values():
+                failed_items.update(item_id for item_id, _ in entries)
+
+    if not results:
+        print("WARNING: No results to update in metadata")
+
+    from_queue = any(record.get('eventSource') == 'aws:sqs' for record in event.get('Records', []))
+    if failed_items and not from_queue:
+        raise RuntimeError(f"Failed to process {', '.join(sorted(failed_items))}")
     
     return {
         'statusCode': 200,
         'body': json.dumps({
             'message': 'Processing complete',
             'results': results
-        })
+        }),
+        'batchItemFailures': [{'itemIdentifier': item_id} for item_id in sorted(failed_items)]
     }